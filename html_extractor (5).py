@@ -1,7 +1,7 @@
 import json
 import os
 from bs4 import BeautifulSoup, Comment, NavigableString
-from language.processors import process_text_block, load_spacy_model
+from language.processors import process_text_block, process_text_blocks, load_spacy_model
 from language.validators import (
     is_pure_symbol,
     is_math_fragment,
@@ -96,28 +96,36 @@ def extract_translatable_html(input_path, lang_code, secondary_lang=None, output
     flattened_output = {}
     block_counter = 1
 
-    elements = list(soup.find_all(string=True))
-    for element in elements:
+    # Collect every translatable text node first so spaCy can parse them in batches
+    text_elements = []
+    for element in soup.find_all(string=True):
         if is_translatable_text(element):
             text = element.strip()
-            if not text:
-                continue
-
-            structured, flattened, sentence_tokens = process_text_block(f"BLOCK_{block_counter}", text, nlp)
-
-            if sentence_tokens:
-                block_id = f"BLOCK_{block_counter}"
-                parent_tag = element.parent.name if element.parent else "no_parent"
-                structured_output[block_id] = {"tag": parent_tag, "tokens": structured}
-                flattened_output.update(flattened)
-                
-                replacement_content = " ".join([token[0] for token in sentence_tokens])
-                if not isinstance(replacement_content, NavigableString):
-                    replacement_content = NavigableString(str(replacement_content))
-                element.replace_with(replacement_content)
-                
-                block_counter += 1
-
+            if text:
+                text_elements.append((element, text))
+
+    text_blocks = [
+        (f"BLOCK_{block_counter + offset}", text)
+        for offset, (_, text) in enumerate(text_elements)
+    ]
+    text_results = process_text_blocks(text_blocks, nlp)
+
+    for (element, _), (block_id, _), (structured, flattened, sentence_tokens) in zip(
+        text_elements, text_blocks, text_results
+    ):
+        if sentence_tokens:
+            parent_tag = element.parent.name if element.parent else "no_parent"
+            structured_output[block_id] = {"tag": parent_tag, "tokens": structured}
+            flattened_output.update(flattened)
+            
+            replacement_content = " ".join([token[0] for token in sentence_tokens])
+            if not isinstance(replacement_content, NavigableString):
+                replacement_content = NavigableString(str(replacement_content))
+            element.replace_with(replacement_content)
+    block_counter += len(text_blocks)
+
+    attr_targets = []
+    attr_blocks = []
     for tag in soup.find_all():
         is_in_language_switcher = False
         for parent in tag.parents:
@@ -132,14 +140,19 @@ def extract_translatable_html(input_path, lang_code, secondary_lang=None, output
             if (attr in tag.attrs and isinstance(tag[attr], str) and attr not in BLOCKED_ATTRS):
                 value = tag[attr].strip()
                 if value:
-                    block_id = f"BLOCK_{block_counter}"
-                    structured, flattened, sentence_tokens = process_text_block(block_id, value, nlp)
-                    structured_output[block_id] = {"attr": attr, "tokens": structured}
-                    flattened_output.update(flattened)
-                    if sentence_tokens:
-                        tag[attr] = sentence_tokens[0][0]
+                    attr_targets.append((tag, attr))
+                    attr_blocks.append((f"BLOCK_{block_counter}", value))
                     block_counter += 1
 
+    attr_results = process_text_blocks(attr_blocks, nlp)
+    for (tag, attr), (block_id, _), (structured, flattened, sentence_tokens) in zip(
+        attr_targets, attr_blocks, attr_results
+    ):
+        structured_output[block_id] = {"attr": attr, "tokens": structured}
+        flattened_output.update(flattened)
+        if sentence_tokens:
+            tag[attr] = sentence_tokens[0][0]
+
     for meta in soup.find_all("meta"):
         name = meta.get("name", "").lower()
         prop = meta.get("property", "").lower()
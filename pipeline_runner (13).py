@@ -1,12 +1,234 @@
 import subprocess
+import contextlib
 import logging
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import io
 from pathlib import Path
 import os
+import selectors
+import shutil
+import sys
 import zipfile
+import threading
 import time
 import json
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from flask import current_app
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    from isal import isal_zlib
+except ImportError:  # Optional: ISA-L SIMD deflate, falls back to zlib
+    isal_zlib = None
+
+# Upload extension -> step 1 --file-type (anything else is treated as HTML)
+EXTENSION_TO_TYPE = {
+    '.sql': 'sql',
+    '.html': 'html',
+    '.pdf': 'pdf',
+    '.py': 'python',
+    '.pyw': 'python',
+    '.jinja': 'python',
+    '.jinja2': 'python',
+    '.j2': 'python',
+}
+
+# Extension of the non_translatable.* template step 1 writes per file type
+TYPE_TO_TEMPLATE_EXTENSION = {'html': '.html', 'sql': '.sql', 'python': '.py'}
+
+# Step 4 template lookup order: (template extension, label for logs)
+TEMPLATE_CHECK_ORDER = [('.sql', 'SQL'), ('.py', 'Python'), ('.pdf', 'PDF'), ('.html', 'HTML')]
+
+# Upper bound on files handled concurrently within one pipeline step
+MAX_PARALLEL_FILES = 8
+
+# ZIP members that are already compressed are stored as-is; everything else
+# (JSON/HTML/SQL/Python/text) is deflated at the fastest level.
+ZIP_STORED_EXTENSIONS = {'.pdf', '.zip', '.gz', '.png', '.jpg', '.jpeg'}
+ZIP_DEFLATE_LEVEL = 1
+ZIP_COPY_BUFFER_SIZE = 1 << 20
+
+# Per-script deadline and progress-report interval, for subprocess and
+# in-process runs alike
+SCRIPT_TIMEOUT = 300  # 5 minutes per script
+PROGRESS_INTERVAL = 10  # Report elapsed time every 10 seconds
+
+# Core scripts exposing main(argv) that are called in-process rather than
+# via a python3 subprocess (see PipelineRunner._run_in_process)
+IN_PROCESS_SCRIPTS = {"step1_extract.py", "step2_translate.py"}
+_SCRIPT_MODULES = {}
+_SCRIPT_MODULES_LOCK = threading.Lock()
+_IN_PROCESS_LOCK = threading.Lock()
+
+
+class _ScriptSiblingFinder(importlib.abc.MetaPathFinder):
+    """
+    Last-resort finder for the top-level packages core scripts import from
+    their own directory (language, utils, extractors, ...). It sits at the
+    end of sys.meta_path, so it only resolves names nothing else provides and,
+    unlike prepending to sys.path, never shadows the app's own modules.
+    """
+
+    def __init__(self):
+        self._dirs = []
+
+    def add_dir(self, directory):
+        if directory not in self._dirs:
+            self._dirs.append(directory)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if path is not None:  # Submodules resolve through their package's __path__
+            return None
+        return importlib.machinery.PathFinder.find_spec(fullname, self._dirs)
+
+
+_SCRIPT_SIBLING_FINDER = _ScriptSiblingFinder()
+
+_DEFLATE_SWAP_LOCK = threading.Lock()
+
+class _ThreadOutputRouter:
+    """
+    Stand-in for sys.stdout/sys.stderr that sends writes from a thread with
+    capture switched on to that thread's buffer, and everything else to the
+    original stream. Unlike contextlib.redirect_stdout this does not swallow
+    output from the rest of the server while an in-process script runs.
+    """
+
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    def _target(self):
+        buffer = getattr(self._local, 'buffer', None)
+        return self._default if buffer is None else buffer
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):  # encoding, isatty, fileno, ...
+        return getattr(self._default, name)
+
+
+_OUTPUT_ROUTER_LOCK = threading.Lock()
+
+
+@contextlib.contextmanager
+def _capture_thread_output(stdout_buffer, stderr_buffer):
+    """Route this thread's sys.stdout/sys.stderr writes into the given buffers."""
+    routers = []
+    with _OUTPUT_ROUTER_LOCK:
+        for name in ('stdout', 'stderr'):
+            stream = getattr(sys, name)
+            if not isinstance(stream, _ThreadOutputRouter):
+                stream = _ThreadOutputRouter(stream)
+                setattr(sys, name, stream)
+            routers.append(stream)
+    stdout_router, stderr_router = routers
+    stdout_router._local.buffer = stdout_buffer
+    stderr_router._local.buffer = stderr_buffer
+    try:
+        yield
+    finally:
+        stdout_router._local.buffer = None
+        stderr_router._local.buffer = None
+
+
+# ioctl request number for reflink copies (linux/fs.h: _IOW(0x94, 9, int))
+FICLONE = 0x40049409
+
+
+def _iter_files(root, subdirs=None):
+    """
+    Yield a Path for every regular file below root (or below root/<subdir>
+    for each of subdirs, in order). Uses os.scandir so the file/dir check
+    comes from the cached DirEntry instead of an extra stat per file.
+    Missing directories are skipped.
+    """
+    pending = [os.path.join(root, d) for d in reversed(subdirs)] if subdirs else [str(root)]
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as entries:
+                children = []
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        children.append(entry.path)
+                    elif entry.is_file():
+                        yield Path(entry.path)
+        except FileNotFoundError:
+            continue
+        pending.extend(reversed(children))
+
+
+def _copy_file(src, dst):
+    """
+    Copy file contents only (no metadata). Tries a reflink first (O(1) on
+    Btrfs/XFS), then an in-kernel copy_file_range, then shutil.copyfile.
+    """
+    if fcntl is not None:
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            return
+        except OSError:
+            pass  # Filesystem without reflink support, or src/dst on different devices
+
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if not copied:
+                        break
+                    remaining -= copied
+            if remaining == 0:
+                return
+        except OSError:
+            pass
+
+    shutil.copyfile(src, dst)
+
+
+@contextlib.contextmanager
+def _accelerated_deflate():
+    """
+    Route zipfile's deflate through isal_zlib while the block runs, when
+    python-isal is installed. ISA-L emits standard DEFLATE streams several
+    times faster than zlib; zipfile only resolves its module-level `zlib`
+    when it creates a compressor, so swapping that reference is enough.
+    """
+    if isal_zlib is None:
+        yield
+        return
+    with _DEFLATE_SWAP_LOCK:
+        original = zipfile.zlib
+        zipfile.zlib = isal_zlib
+        try:
+            yield
+        finally:
+            zipfile.zlib = original
+
+
+def _fsync_path(path):
+    """Flush one finished file to disk (instead of a system-wide os.sync())."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
 
 class PipelineRunner:
     def __init__(self, session_path, env):
@@ -18,6 +240,14 @@ class PipelineRunner:
         self.env = env
         self.logger = logging.getLogger('pipeline')
         self.session_id = self.session_path.name
+
+        # Per-step directories, built once and shared by every per-file helper
+        self.uploads_root = self.session_path / "uploads"
+        self.extracted_root = self.session_path / "extracted"
+        self.translated_root = self.session_path / "translated"
+        self.refined_root = self.session_path / "refined"
+        self.final_root = self.session_path / "final"
+        self.results_root = self.session_path / "results"
         self.tracker = current_app.progress_tracker
 
         # ADD THE NEW LOGGING LINES RIGHT HERE:
@@ -28,6 +258,7 @@ class PipelineRunner:
     
         
         # Track processing results
+        self._results_lock = threading.Lock()
         self.results = {
             'files_processed': 0,
             'files_extracted': 0,
@@ -37,17 +268,25 @@ class PipelineRunner:
             'errors': []
         }
 
+        # In-process script threads that overran their deadline and may still
+        # be writing outputs (threads cannot be killed)
+        self._abandoned_workers = []
+
     
     def _generate_memory_report(self):
         """Generate a comprehensive memory usage report after processing"""
         
         try:
-            # Check for batch memory stats
-            batch_stats_file = self.session_path / "memory_usage_batch.json"
+            # Step 2 appends one line per file to this journal
+            batch_stats_journal = self.translated_root / "memory_usage_batch.jsonl"
             
-            if batch_stats_file.exists():
-                with open(batch_stats_file, 'r') as f:
-                    batch_data = json.load(f)
+            if batch_stats_journal.exists():
+                step2 = self._load_script_module(self._script_path("step2_translate.py"))
+                batch_data = step2.compute_summary(batch_stats_journal)
+                
+                # The metrics page and its download route read the batch JSON
+                with open(self.translated_root / "memory_usage_batch.json", 'w', encoding='utf-8') as f:
+                    json.dump(batch_data, f, indent=2, ensure_ascii=False)
                 
                 # Create formatted report
                 report_lines = [
@@ -133,7 +372,7 @@ class PipelineRunner:
                 ])
                 
                 # Save report
-                report_file = self.session_path / "results" / "memory_efficiency_report.txt"
+                report_file = self.results_root / "memory_efficiency_report.txt"
                 with open(report_file, 'w', encoding='utf-8') as f:
                     f.write('\n'.join(report_lines))
                 
@@ -152,7 +391,7 @@ class PipelineRunner:
                     'efficiency_rating': 'excellent' if overall_rate > 50 else 'good' if overall_rate > 30 else 'moderate' if overall_rate > 15 else 'low'
                 }
                 
-                summary_file = self.session_path / "results" / "memory_stats_summary.json"
+                summary_file = self.results_root / "memory_stats_summary.json"
                 with open(summary_file, 'w', encoding='utf-8') as f:
                     json.dump(stats_summary, f, indent=2)
                 
@@ -198,7 +437,7 @@ class PipelineRunner:
                 file_metrics = {'filename': html_name}
                 
                 # DeepL metrics
-                deepl_file = self.session_path / "translated" / basename / "deepl_metrics.json"
+                deepl_file = self.translated_root / basename / "deepl_metrics.json"
                 if deepl_file.exists():
                     with open(deepl_file, 'r') as f:
                         deepl_data = json.load(f)
@@ -212,7 +451,7 @@ class PipelineRunner:
                 
                 # OpenAI metrics (if refinement enabled)
                 if enable_refinement:
-                    openai_file = self.session_path / "refined" / basename / "openai_metrics.json"
+                    openai_file = self.refined_root / basename / "openai_metrics.json"
                     if openai_file.exists():
                         with open(openai_file, 'r') as f:
                             openai_data = json.load(f)
@@ -280,7 +519,7 @@ class PipelineRunner:
             }
             
             # Save consolidated report
-            report_file = self.session_path / "refined" / "consolidated_metrics.json"
+            report_file = self.refined_root / "consolidated_metrics.json"
             with open(report_file, 'w', encoding='utf-8') as f:
                 json.dump(consolidated_metrics, f, indent=2, ensure_ascii=False)
             
@@ -321,7 +560,7 @@ class PipelineRunner:
             ])
             
             # Save readable summary
-            summary_file = self.session_path / "results" / "metrics_summary.txt"
+            summary_file = self.results_root / "metrics_summary.txt"
             with open(summary_file, 'w', encoding='utf-8') as f:
                 f.write('\n'.join(summary_lines))
             
@@ -333,21 +572,199 @@ class PipelineRunner:
             self.logger.error(f"[Pipeline] Failed to generate consolidated metrics: {e}")
             return False   
     
-    def _execute_script(self, script_name, args):
+    def _wait_for_child(self, process, timeout):
         """
-        Run a Python script under core_scripts/ with the given arguments.
-        Return True on exit code 0, otherwise False.
+        Block until the child exits and return its (stdout, stderr).
+        On Linux the wait is a single select() on a pidfd, so completion is
+        noticed immediately without polling. Raises subprocess.TimeoutExpired.
         """
-        if script_name == "step1_extract.py":
-           script_path = (Path(__file__).parent.parent.parent/ "core_scripts"/ "extraction"/ script_name
-           )
+        output = {}
+
+        def drain(name, stream):
+            output[name] = stream.read()
+            stream.close()
+
+        # Pipes must be drained concurrently or a chatty child blocks on write
+        readers = [
+            threading.Thread(target=drain, args=(name, stream), daemon=True)
+            for name, stream in (('stdout', process.stdout), ('stderr', process.stderr))
+            if stream is not None
+        ]
+        for reader in readers:
+            reader.start()
+
+        pidfd = None
+        if hasattr(os, 'pidfd_open'):
+            try:
+                pidfd = os.pidfd_open(process.pid)
+            except OSError:
+                pidfd = None  # Kernel < 5.3 or seccomp: fall back to wait()
+
+        if pidfd is not None:
+            try:
+                with selectors.DefaultSelector() as selector:
+                    selector.register(pidfd, selectors.EVENT_READ)
+                    ready = selector.select(timeout)
+            finally:
+                os.close(pidfd)
+            if not ready:
+                raise subprocess.TimeoutExpired(process.args, timeout)
+            process.wait()
         else:
-        # All other scripts (step2, step3, step4) remain in core_scripts root
-           script_path = (
-            Path(__file__).parent.parent.parent
-            / "core_scripts"
-            / script_name
+            process.wait(timeout=timeout)
+
+        for reader in readers:
+            reader.join()
+        return output.get('stdout'), output.get('stderr')
+
+    def _load_script_module(self, script_path):
+        """Import a core script once per process and return the module."""
+        with _SCRIPT_MODULES_LOCK:
+            module = _SCRIPT_MODULES.get(script_path)
+            if module is None:
+                # Scripts import their siblings (e.g. language.processors)
+                # absolutely; resolve those from the script's directory
+                # without adding it to the server-wide sys.path
+                _SCRIPT_SIBLING_FINDER.add_dir(str(script_path.parent))
+                if _SCRIPT_SIBLING_FINDER not in sys.meta_path:
+                    sys.meta_path.append(_SCRIPT_SIBLING_FINDER)
+                spec = importlib.util.spec_from_file_location(
+                    f"core_scripts.{script_path.stem}", script_path
+                )
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                _SCRIPT_MODULES[script_path] = module
+            return module
+
+    def _run_in_process(self, script_name, script_path, args, step_num, base_msg=None, timeout=SCRIPT_TIMEOUT):
+        """
+        Call the script's main(argv) directly instead of spawning python3, so
+        interpreter startup and spaCy/DeepL imports are paid once per process.
+        Return True on exit code 0, False on failure or timeout, and None when
+        the in-process slot is taken so the caller should use a subprocess.
+        """
+        try:
+            module = self._load_script_module(script_path)
+        except Exception as e:
+            self.logger.error(f"[Pipeline] {script_name} execution error: {str(e)}")
+            self.logger.exception("Full traceback:")
+            self._record_error(f"{script_name}: {str(e)[:200]}")
+            self.tracker.update(
+                self.session_id, 
+                step_num, 
+                f"Error: {str(e)[:100]}",
+                error_code="script_failed"
+            )
+            return False
+
+        # Step scripts share module-level state (models, caches) and are not
+        # written to be re-entrant, so only one runs in-process at a time. A
+        # busy slot (another session, or a run that overran its deadline and
+        # is still winding down) means this run goes to a subprocess instead.
+        if not _IN_PROCESS_LOCK.acquire(blocking=False):
+            self.logger.info(f"[Pipeline] In-process slot busy; running {script_name} as a subprocess")
+            return None
+
+        self.logger.info(f"[Pipeline] Running in-process: {script_name} {' '.join(args)}")
+        stdout_buffer = io.StringIO()
+        stderr_buffer = io.StringIO()
+        outcome = {}
+
+        def run_main():
+            try:
+                # Capture what the script prints so failures reach the user,
+                # as they do for subprocess runs
+                with _capture_thread_output(stdout_buffer, stderr_buffer):
+                    try:
+                        outcome['exit_code'] = module.main(args)
+                    except SystemExit as e:  # argparse errors, sys.exit() in helpers
+                        outcome['exit_code'] = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                    except Exception as e:
+                        outcome['error'] = e
+                        traceback.print_exc()
+            finally:
+                # Released by the worker itself, so a timed-out run keeps the
+                # slot until it really ends
+                _IN_PROCESS_LOCK.release()
+
+        worker = threading.Thread(target=run_main, name=f"pipeline-{script_name}", daemon=True)
+        start_time = time.time()
+        worker.start()
+
+        # Wait with the same deadline and progress reports as a subprocess
+        deadline = start_time + timeout
+        while True:
+            worker.join(max(0.0, min(PROGRESS_INTERVAL, deadline - time.time())))
+            if not worker.is_alive():
+                break
+            elapsed = time.time() - start_time
+            if time.time() >= deadline:
+                # A thread cannot be killed; it is abandoned and the step fails
+                self.logger.error(f"[Pipeline] {script_name} timed out after {elapsed:.1f} seconds")
+                self._abandoned_workers.append(worker)
+                self.tracker.update(
+                    self.session_id, 
+                    step_num, 
+                    f"Error: {script_name} timed out"
+                )
+                return False
+            if base_msg:
+                self.tracker.update(self.session_id, step_num, f"{base_msg} ({int(elapsed)}s)")
+
+        stdout = stdout_buffer.getvalue()
+        stderr = stderr_buffer.getvalue()
+
+        if 'error' in outcome:
+            e = outcome['error']
+            self.logger.error(f"[Pipeline] {script_name} execution error: {str(e)}")
+            self.logger.error(f"[Pipeline] stderr: {stderr}")
+            self._record_error(f"{script_name}: {str(e)[:200]}")
+            self.tracker.update(
+                self.session_id, 
+                step_num, 
+                f"Error: {str(e)[:100]}",
+                error_code="script_failed"
+            )
+            return False
+
+        exit_code = outcome['exit_code']
+        if not exit_code:
+            self.logger.info(f"[Pipeline] {script_name} completed successfully")
+            if stdout and self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"[Pipeline] {script_name} output: {stdout[:500]}")
+            return True
+
+        self.logger.error(f"[Pipeline] {script_name} failed (exit code {exit_code})")
+        if stderr:
+            self.logger.error(f"[Pipeline] stderr: {stderr}")
+        if stdout:
+            self.logger.error(f"[Pipeline] stdout: {stdout}")
+
+        # Step 2 reports its failure ("❌ Error: ...") on stdout, not stderr
+        stdout_lines = stdout.strip().splitlines()
+        error_msg = stderr.strip() or (stdout_lines[-1] if stdout_lines else f"Exit code {exit_code}")
+        self._record_error(f"{script_name}: {error_msg[:200]}")
+        self.tracker.update(
+            self.session_id, 
+            step_num, 
+            f"Error: {error_msg[:100]}",
+            error_code="script_failed"
         )
+        return False
+
+    def _script_path(self, script_name):
+        """Location of a core script; step 1 lives under core_scripts/extraction."""
+        if script_name == "step1_extract.py":
+            return Path(__file__).parent.parent.parent / "core_scripts" / "extraction" / script_name
+        # All other scripts (step2, step3, step4) remain in core_scripts root
+        return Path(__file__).parent.parent.parent / "core_scripts" / script_name
+
+    def _execute_script(self, script_name, args, timeout=SCRIPT_TIMEOUT):
+        """
+        Run a Python script under core_scripts/ with the given arguments,
+        allowing it timeout seconds. Return True on exit code 0, otherwise False.
+        """
+        script_path = self._script_path(script_name)
         
         self.logger.info(f"[Pipeline] Looking for script at: {script_path}")
         
@@ -360,9 +777,6 @@ class PipelineRunner:
             )
             return False
 
-        cmd = ["python3", str(script_path)] + args
-        self.logger.info(f"[Pipeline] Executing: {' '.join(cmd)}")
-        
         # Update progress before starting the script
         step_names = {
             "step1_extract.py": (1, "Extracting content from HTML..."),
@@ -374,6 +788,15 @@ class PipelineRunner:
         if script_name in step_names:
             step_num, step_msg = step_names[script_name]
             self.tracker.update(self.session_id, step_num, step_msg)
+
+        if script_name in IN_PROCESS_SCRIPTS:
+            step_num, base_msg = step_names.get(script_name, (1, None))
+            result = self._run_in_process(script_name, script_path, args, step_num, base_msg, timeout)
+            if result is not None:
+                return result
+
+        cmd = ["python3", str(script_path)] + args
+        self.logger.info(f"[Pipeline] Executing: {' '.join(cmd)}")
         
         try:
             # Create subprocess with proper environment
@@ -382,77 +805,76 @@ class PipelineRunner:
                 cwd=self.session_path,
                 env=self.env,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,  # Line buffered
-                universal_newlines=True
+                stderr=subprocess.PIPE  # Raw bytes, decoded only when logged
             )
             
-            # Monitor the process with periodic progress updates
+            # Wait for completion; a helper thread reports elapsed time meanwhile
             start_time = time.time()
-            timeout = 300  # 5 minutes per script
-            check_interval = 5  # Check every 5 seconds
-            
-            while True:
-                # Check if process is still running
-                poll_result = process.poll()
-                
-                if poll_result is not None:
-                    # Process finished
-                    stdout, stderr = process.communicate()
-                    
-                    if poll_result == 0:
-                        self.logger.info(f"[Pipeline] {script_name} completed successfully")
-                        if stdout:
-                            self.logger.debug(f"[Pipeline] {script_name} output: {stdout[:500]}")  # First 500 chars
-                        return True
-                    else:
-                        self.logger.error(f"[Pipeline] {script_name} failed (exit code {poll_result})")
-                        if stderr:
-                            self.logger.error(f"[Pipeline] stderr: {stderr}")
-                            # Also add to results errors for user visibility
-                            self.results['errors'].append(f"{script_name}: {stderr[:200]}")
-                        if stdout:
-                            self.logger.error(f"[Pipeline] stdout: {stdout}")
-                        
-                        # Update tracker with specific error
-                        error_msg = stderr.strip() if stderr else f"Exit code {poll_result}"
-                        if script_name in step_names:
-                            step_num, _ = step_names[script_name]
-                            self.tracker.update(
-                                self.session_id, 
-                                step_num, 
-                                f"Error: {error_msg[:100]}",
-                                error_code="script_failed"
-                            )
-                        return False
-                
-                # Check for timeout
-                elapsed = time.time() - start_time
-                if elapsed > timeout:
-                    self.logger.error(f"[Pipeline] {script_name} timed out after {elapsed:.1f} seconds")
-                    process.terminate()
-                    time.sleep(1)
-                    if process.poll() is None:
-                        process.kill()
-                    self.tracker.update(
-                        self.session_id, 
-                        step_num if script_name in step_names else 1, 
-                        f"Error: {script_name} timed out"
-                    )
-                    return False
-                
-                # Update progress with elapsed time
-                if script_name in step_names and int(elapsed) % 10 == 0:
-                    step_num, base_msg = step_names[script_name]
+            progress_interval = PROGRESS_INTERVAL
+            step_num, base_msg = step_names.get(script_name, (1, None))
+
+            progress_stop = threading.Event()
+
+            def report_progress():
+                while not progress_stop.wait(progress_interval):
+                    elapsed = time.time() - start_time
                     self.tracker.update(
                         self.session_id, 
                         step_num, 
                         f"{base_msg} ({int(elapsed)}s)"
                     )
-                
-                # Wait before next check
-                time.sleep(check_interval)
+
+            if base_msg:
+                threading.Thread(target=report_progress, daemon=True).start()
+
+            try:
+                stdout, stderr = self._wait_for_child(process, timeout)
+            except subprocess.TimeoutExpired:
+                elapsed = time.time() - start_time
+                self.logger.error(f"[Pipeline] {script_name} timed out after {elapsed:.1f} seconds")
+                process.terminate()
+                try:
+                    process.wait(timeout=1)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+                self.tracker.update(
+                    self.session_id, 
+                    step_num, 
+                    f"Error: {script_name} timed out"
+                )
+                return False
+            finally:
+                progress_stop.set()
+
+            returncode = process.returncode
+            if returncode == 0:
+                self.logger.info(f"[Pipeline] {script_name} completed successfully")
+                if stdout and self.logger.isEnabledFor(logging.DEBUG):
+                    output = stdout[:500].decode('utf-8', errors='replace')  # First 500 bytes
+                    self.logger.debug(f"[Pipeline] {script_name} output: {output}")
+                return True
+
+            self.logger.error(f"[Pipeline] {script_name} failed (exit code {returncode})")
+            stdout = stdout.decode('utf-8', errors='replace') if stdout else ''
+            stderr = stderr.decode('utf-8', errors='replace') if stderr else ''
+            if stderr:
+                self.logger.error(f"[Pipeline] stderr: {stderr}")
+                # Also add to results errors for user visibility
+                self._record_error(f"{script_name}: {stderr[:200]}")
+            if stdout:
+                self.logger.error(f"[Pipeline] stdout: {stdout}")
+            
+            # Update tracker with specific error
+            error_msg = stderr.strip() if stderr else f"Exit code {returncode}"
+            if script_name in step_names:
+                self.tracker.update(
+                    self.session_id, 
+                    step_num, 
+                    f"Error: {error_msg[:100]}",
+                    error_code="script_failed"
+                )
+            return False
                 
         except Exception as e:
             self.logger.error(f"[Pipeline] {script_name} execution error: {str(e)}")
@@ -464,52 +886,59 @@ class PipelineRunner:
             )
             return False
 
+    def _add_to_zip(self, archive, file_path, arcname):
+        """
+        Write one member, skipping deflate for already-compressed formats.
+        Contents are streamed in 1 MiB chunks rather than zipfile's 8 KiB default.
+        """
+        zinfo = zipfile.ZipInfo.from_file(file_path, arcname=arcname)
+        if file_path.suffix.lower() in ZIP_STORED_EXTENSIONS:
+            zinfo.compress_type = zipfile.ZIP_STORED
+        else:
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            if hasattr(zinfo, 'compress_level'):  # Python 3.13+
+                zinfo.compress_level = ZIP_DEFLATE_LEVEL
+            else:
+                zinfo._compresslevel = ZIP_DEFLATE_LEVEL
+
+        with open(file_path, 'rb', buffering=ZIP_COPY_BUFFER_SIZE) as src, \
+                archive.open(zinfo, mode='w') as dst:
+            shutil.copyfileobj(src, dst, ZIP_COPY_BUFFER_SIZE)
+
     def _create_per_file_zip(self, basename, results_base, final_base):
         """Create a ZIP for one file (final outputs only)."""
         zip_path = results_base / f"{basename}.zip"
         try:
-            if zip_path.exists():
-                zip_path.unlink()
+            zip_path.unlink(missing_ok=True)
                 
             with zipfile.ZipFile(zip_path, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
                 final_dir = final_base / basename
-                if final_dir.exists():
-                    for file_path in final_dir.rglob('*'):
-                        if file_path.is_file():
-                            rel_path = file_path.relative_to(final_dir)
-                            archive.write(file_path, arcname=str(rel_path))
+                for file_path in _iter_files(final_dir):
+                    rel_path = file_path.relative_to(final_dir)
+                    self._add_to_zip(archive, file_path, str(rel_path))
+            _fsync_path(zip_path)
                             
             self.logger.info(f"[Pipeline] Created per-file ZIP: results/{basename}.zip")
             return True
         except Exception as e:
             self.logger.error(f"[Pipeline] Failed to create ZIP for {basename}: {e}")
-            self.results['errors'].append(f"ZIP creation failed for {basename}: {str(e)}")
+            self._record_error(f"ZIP creation failed for {basename}: {str(e)}")
             return False
 
     def _create_batch_output_zip(self, results_base):
         """Create comprehensive batch output ZIP with all intermediate files."""
         zip_path = results_base / "batch-output.zip"
         try:
-            if zip_path.exists():
-                zip_path.unlink()
+            zip_path.unlink(missing_ok=True)
                 
-            with zipfile.ZipFile(zip_path, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
-                # Add all step directories
-                for step_dir in ['extracted', 'translated', 'refined', 'final']:
-                    step_path = self.session_path / step_dir
-                    if step_path.exists():
-                        for file_path in step_path.rglob('*'):
-                            if file_path.is_file():
-                                rel_path = file_path.relative_to(self.session_path)
-                                archive.write(file_path, arcname=str(rel_path))
-                
-                # Add original uploads
-                uploads_path = self.session_path / 'uploads'
-                if uploads_path.exists():
-                    for file_path in uploads_path.rglob('*'):
-                        if file_path.is_file():
-                            rel_path = file_path.relative_to(self.session_path)
-                            archive.write(file_path, arcname=str(rel_path))
+            with _accelerated_deflate(), \
+                    zipfile.ZipFile(zip_path, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+                # All step directories plus the original uploads, in one walk
+                subdirs = ['extracted', 'translated', 'refined', 'final', 'uploads']
+                for file_path in _iter_files(self.session_path, subdirs):
+                    rel_path = file_path.relative_to(self.session_path)
+                    self._add_to_zip(archive, file_path, str(rel_path))
+            _fsync_path(zip_path)
 
             self.logger.info(f"[Pipeline] Created batch output ZIP: results/batch-output.zip")
             return True
@@ -518,6 +947,248 @@ class PipelineRunner:
             self.results['errors'].append(f"Batch ZIP creation failed: {str(e)}")
             return False
 
+    def _wait_for_abandoned_runs(self):
+        """
+        Give in-process runs that overran their deadline one more SCRIPT_TIMEOUT
+        each to finish. Return False if any is still running.
+        """
+        for worker in self._abandoned_workers:
+            worker.join(SCRIPT_TIMEOUT)
+        self._abandoned_workers = [worker for worker in self._abandoned_workers if worker.is_alive()]
+        return not self._abandoned_workers
+
+    def _record_success(self, key):
+        """Increment a per-step success counter (safe from worker threads)."""
+        with self._results_lock:
+            self.results[key] += 1
+
+    def _record_error(self, error_msg):
+        """Append a user-visible error (safe from worker threads)."""
+        with self._results_lock:
+            self.results['errors'].append(error_msg)
+
+    def _run_per_file(self, worker, file_names):
+        """
+        Run worker(file_name) for every file on a thread pool and wait for all
+        of them, so each pipeline step still finishes before the next starts.
+        """
+        if not file_names:
+            return
+        max_workers = min(MAX_PARALLEL_FILES, len(file_names))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(worker, file_names))
+
+    def _classify_upload(self, html_name):
+        """Return the step 1 file type for an uploaded file, or None if it is missing."""
+        file_extension = Path(html_name).suffix.lower()
+        file_type = EXTENSION_TO_TYPE.get(file_extension)
+        if file_type is None:
+            file_type = "html"
+            self.logger.warning(f"[Pipeline] Unknown file extension {file_extension}, defaulting to HTML")
+
+        input_file = self.uploads_root / html_name
+        
+        # Diagnostic: Check if input file exists (one stat for existence and size)
+        try:
+            input_size = input_file.stat().st_size
+        except FileNotFoundError:
+            error_msg = f"Input file not found: {input_file}"
+            self.logger.error(f"[Pipeline] {error_msg}")
+            self._record_error(error_msg)
+            return None
+        
+        self.logger.info(f"[Pipeline] Input file: {input_file} (exists: True, size: {input_size} bytes)")
+        self.logger.info(f"[Pipeline] Detected file type: {file_type}")
+        return file_type
+
+    def _extract_batch(self, html_names, file_type, primary_lang, secondary_lang):
+        """Step 1 for every upload of one file type, in a single step1_extract.py run."""
+        args = [str(self.uploads_root / html_name) for html_name in html_names]
+        args += [
+            "--lang", primary_lang,
+            "--output-root", str(self.extracted_root),
+            "--file-type", file_type
+        ]
+        if secondary_lang:
+            args += ["--secondary-lang", secondary_lang]
+
+        self.logger.info(f"[Pipeline] Step 1: Extracting {file_type.upper()} content from {len(html_names)} file(s)")
+
+        self.logger.info(f"[Pipeline] Step 1 args: {args}")
+        
+        # The batch gets the per-file deadline once for each of its files
+        success = self._execute_script("step1_extract.py", args, timeout=SCRIPT_TIMEOUT * len(html_names))
+
+        # An in-process run that timed out keeps writing extracted/ until it
+        # ends, so let it finish before its outputs are judged
+        if not success and not self._wait_for_abandoned_runs():
+            self.logger.error("[Pipeline] Step 1 is still running past its deadline")
+
+        # A failed batch run may still have extracted some of its files,
+        # so success is judged per file from the outputs on disk.
+        for html_name in html_names:
+            output_dir = self.extracted_root / Path(html_name).stem
+            if not (output_dir / "translatable_flat.json").exists():
+                error_msg = f"Content extraction failed for {html_name} ({file_type.upper()} file)"
+                self.logger.error(f"[Pipeline] {error_msg}")
+                self._record_error(error_msg)
+                continue
+
+            self._record_success('files_extracted')
+            self.logger.info(f"[Pipeline] Step 1 completed for {html_name} ({file_type.upper()} file)")
+            
+            # Check if expected output files were created
+            expected_files = ['translatable_flat.json', 'translatable_structured.json', 'translatable_flat_sentences.json']
+            if file_type in TYPE_TO_TEMPLATE_EXTENSION:
+                expected_files.append(f"non_translatable{TYPE_TO_TEMPLATE_EXTENSION[file_type]}")
+        
+            for expected in expected_files:
+                try:
+                    size = (output_dir / expected).stat().st_size
+                except FileNotFoundError:
+                    self.logger.warning(f"[Pipeline] Missing expected output: {expected}")
+                else:
+                    self.logger.info(f"[Pipeline] Created: {expected} ({size} bytes)")
+
+    def _refine_one(self, html_name, primary_lang, secondary_lang, target_lang, refinement_mode):
+        """Step 3 for a single translated file."""
+        basename = Path(html_name).stem
+        
+        # Check if step 2 outputs exist
+        context_json = self.extracted_root / basename / "translatable_flat_sentences.json"
+        segments_json = self.translated_root / basename / "segments_only.json"
+        
+        if not (context_json.exists() and segments_json.exists()):
+            error_msg = f"Skipping GPT refinement for {html_name} - missing translation outputs"
+            self.logger.warning(f"[Pipeline] {error_msg}")
+            self._record_error(error_msg)
+            return
+
+        # Prepare step 3 arguments
+        output_dir = self.refined_root / basename
+        output_dir.mkdir(exist_ok=True, parents=True)
+
+        args = [
+            "--context", str(context_json),
+            "--translated", str(segments_json),
+            
+            "--primary-lang", primary_lang,
+            "--target-lang", target_lang,
+            "--output", str(output_dir / "openai_translations.json")
+        ]
+        if secondary_lang:
+            args += ["--secondary-lang", secondary_lang]
+        if refinement_mode == "refinement":
+            args.append("--skip-harmonization")
+
+        
+        self.logger.info(f"[Pipeline] Step 3: GPT refining {html_name} (mode:{refinement_mode})")
+        
+        success = self._execute_script("step3_gpt_process.py", args)
+        
+        if success:
+            self._record_success('files_refined')
+            self.logger.info(f"[Pipeline] Step 3 completed for {html_name}")
+        else:
+            error_msg = f"GPT refinement failed for {html_name} (OpenAI API key may be missing/invalid)"
+            self.logger.error(f"[Pipeline] {error_msg}")
+            self._record_error(error_msg)
+
+    def _merge_one(self, file_name, target_lang, enable_refinement):
+        """Step 4 for a single file."""
+        upload_name = Path(file_name)
+        basename = upload_name.stem
+        
+        # Prepare paths for merging - detect file type
+        original_file = self.uploads_root / file_name
+        file_extension = upload_name.suffix.lower()
+        
+        # Determine which extracted template to use (first match wins)
+        extracted_dir = self.extracted_root / basename
+        for output_extension, file_type in TEMPLATE_CHECK_ORDER:
+            non_translatable_file = extracted_dir / f"non_translatable{output_extension}"
+            if non_translatable_file.exists():
+                break
+        else:
+            error_msg = f"Skipping merge for {file_name} - no extracted content template found"
+            self.logger.warning(f"[Pipeline] {error_msg}")
+            self._record_error(error_msg)
+            return
+        
+        deepl_json = self.translated_root / basename / "segments_only.json"
+        openai_json = self.refined_root / basename / "openai_translations.json"
+        
+        # Create final output directory
+        final_dir = self.final_root / basename
+        final_dir.mkdir(exist_ok=True, parents=True)
+        
+        # Check what files are available for merging
+        has_extracted = True  # The template lookup above only falls through on an existing file
+        has_deepl = deepl_json.exists()
+        has_openai = openai_json.exists() and enable_refinement  # Only consider OpenAI if refinement was enabled
+        
+        # Determine merge strategy based on available files
+        merge_success = False
+        
+        if has_deepl and has_openai:
+            # Full merge with both translation services
+            args = [
+                "--input", str(non_translatable_file),
+                "--deepl", str(deepl_json),
+                "--openai", str(openai_json),
+                "--output-deepl", str(final_dir / f"final_deepl_{target_lang.lower()}{output_extension}"),
+                "--output-openai", str(final_dir / f"final_openai_{target_lang.lower()}{output_extension}"),
+                "--target-lang", target_lang.lower(),
+                "--both"
+            ]
+            
+            self.logger.info(f"[Pipeline] Step 4: Full merge (DeepL + OpenAI) for {file_name} ({file_type})")
+            merge_success = self._execute_script("step4_merge.py", args)
+            
+        elif has_deepl:
+            # DeepL-only merge (either refinement disabled or failed)
+            args = [
+                "--input", str(non_translatable_file),
+                "--deepl", str(deepl_json),
+                "--output-deepl", str(final_dir / f"final_deepl_{target_lang.lower()}{output_extension}"),
+                "--target-lang", target_lang.lower()
+            ]
+            
+            refinement_status = "refinement disabled" if not enable_refinement else "OpenAI refinement failed"
+            self.logger.info(f"[Pipeline] Step 4: DeepL-only merge ({refinement_status}) for {file_name} ({file_type})")
+            merge_success = self._execute_script("step4_merge.py", args)
+            
+        else:
+            # Fallback: copy original file with a note
+            try:
+                fallback_path = final_dir / f"original_{basename}{file_extension}"
+                _copy_file(original_file, fallback_path)
+                
+                # Add a note about processing status
+                note_path = final_dir / f"processing_note_{basename}.txt"
+                with open(note_path, 'w') as f:
+                    f.write(f"Processing Status for {file_name}:\n")
+                    f.write(f"- Content extraction: {'✓' if has_extracted else '✗'}\n")
+                    f.write(f"- Translation: {'✗ (API issues)' if not has_deepl else '✓'}\n")
+                    refinement_note = "✗ (disabled)" if not enable_refinement else "✗ (API issues)"
+                    f.write(f"- GPT refinement: {refinement_note}\n")
+                    f.write(f"\nOriginal file preserved as: original_{basename}{file_extension}\n")
+                
+                merge_success = True
+                self.logger.info(f"[Pipeline] Step 4: Fallback preservation for {file_name}")
+                
+            except Exception as e:
+                self.logger.error(f"[Pipeline] Failed to preserve original file {file_name}: {e}")
+                merge_success = False
+        
+        if merge_success:
+            self._record_success('files_merged')
+            self.logger.info(f"[Pipeline] Step 4 completed for {file_name}")
+        else:
+            error_msg = f"Final merge failed for {file_name}"
+            self.logger.error(f"[Pipeline] {error_msg}")
+            self._record_error(error_msg)
+
     def run_batch(self, html_filenames, primary_lang, secondary_lang, target_lang, enable_refinement=True, refinement_mode="full"):
         """
         Run the entire pipeline (steps 1→5) for multiple files with resilient error handling.
@@ -548,100 +1219,43 @@ class PipelineRunner:
             self.logger.info(f"[Pipeline] Available scripts: {[s.name for s in scripts]}")
         
         # Create all required directories
-        for dirname in ['extracted', 'translated', 'refined', 'final', 'results']:
-            (self.session_path / dirname).mkdir(exist_ok=True)
+        for step_root in (self.extracted_root, self.translated_root, self.refined_root,
+                          self.final_root, self.results_root):
+            step_root.mkdir(exist_ok=True)
 
         # ═══ STEP 1: CONTENT EXTRACTION ═══
         tracker.update(session_id, 1, "Extracting content from uploaded files...")
         
-        
+        # One step1_extract.py run per file type instead of one per file
+        uploads_by_type = {}
         for html_name in html_filenames:
             self.results['files_processed'] += 1
-            basename = Path(html_name).stem
-            file_extension = Path(html_name).suffix.lower()
-            if file_extension == '.sql':
-               file_type = "sql"
-            elif file_extension == '.html':
-                 file_type = "html"
-            elif file_extension in ['.py', '.pyw', '.jinja', '.jinja2', '.j2']:
-                 file_type = "python"
-            elif file_extension == '.pdf':
-                 file_type = "pdf"
-            else:
-                 file_type = "html"
-                 self.logger.warning(f"[Pipeline] Unknown file extension {file_extension}, defaulting to HTML")
-                
-            
-    
-            
-            # Prepare step 1 arguments
-            input_file = self.session_path / "uploads" / html_name
-            output_dir = self.session_path / "extracted" / basename
-            output_dir.mkdir(exist_ok=True, parents=True)
-            
-            # Diagnostic: Check if input file exists
-            if not input_file.exists():
-                error_msg = f"Input file not found: {input_file}"
-                self.logger.error(f"[Pipeline] {error_msg}")
-                self.results['errors'].append(error_msg)
-                continue
-            
-            self.logger.info(f"[Pipeline] Input file: {input_file} (exists: {input_file.exists()}, size: {input_file.stat().st_size if input_file.exists() else 0} bytes)")
-            self.logger.info(f"[Pipeline] Detected file type: {file_type}")
-            
+            file_type = self._classify_upload(html_name)
+            if file_type:
+                uploads_by_type.setdefault(file_type, []).append(html_name)
 
-            args = [
-                str(input_file),
-                "--lang", primary_lang,
-                "--output-dir", str(output_dir),
-                "--file-type", file_type
-            ]
-            if secondary_lang:
-                args += ["--secondary-lang", secondary_lang]
-            if translate_placeholders:
-                args += ["--translate-placeholders"]
-
-            self.logger.info(f"[Pipeline] Step 1: Extracting {file_type.upper()} content from {html_name}")
-  
-            self.logger.info(f"[Pipeline] Step 1 args: {args}")
-            
-            success = self._execute_script("step1_extract.py", args)
-            
-            if success:
-                self.results['files_extracted'] += 1
-                self.logger.info(f"[Pipeline] Step 1 completed for {html_name} ({file_type.upper()} file)")
-        
-                
-                # Check if expected output files were created
-                expected_files = ['translatable_flat.json', 'translatable_structured.json', 'translatable_flat_sentences.json']
-                if file_type == "html":
-                    expected_files.append('non_translatable.html')
-                elif file_type == "sql":
-                    expected_files.append('non_translatable.sql')
-                elif file_type == "python":
-                    expected_files.append('non_translatable.py')
-            
-                for expected in expected_files:
-                    file_path = output_dir / expected
-                    if file_path.exists():
-                        self.logger.info(f"[Pipeline] Created: {expected} ({file_path.stat().st_size} bytes)")
-                    else:
-                        self.logger.warning(f"[Pipeline] Missing expected output: {expected}")
-            else:
-                error_msg = f"Content extraction failed for {html_name} ({file_type.upper()} file)"
-       
-                self.logger.error(f"[Pipeline] {error_msg}")
-                self.results['errors'].append(error_msg)
+        for file_type, names in uploads_by_type.items():
+            self._extract_batch(names, file_type, primary_lang, secondary_lang)
 
         # ═══ STEP 2: TRANSLATION ═══
         tracker.update(session_id, 2, "Translating extracted content...")
-        shared_memory_file = self.session_path / "translation_memory.json"
+        shared_memory_file = self.session_path / "translation_memory.jsonl"
+
+        # A step 1 thread that never finished still holds the in-process slot
+        # and may be half-way through writing the files step 2 would read
+        step1_running = any(worker.is_alive() for worker in self._abandoned_workers)
+        if step1_running:
+            error_msg = "Translation skipped - content extraction is still running past its deadline"
+            self.logger.error(f"[Pipeline] {error_msg}")
+            self.results['errors'].append(error_msg)
         
-        for html_name in html_filenames:
+        # Kept sequential: later files rely on cache hits from the translations
+        # earlier files append to the shared memory journal.
+        for html_name in ([] if step1_running else html_filenames):
             basename = Path(html_name).stem
             
             # Check if step 1 output exists
-            input_json = self.session_path / "extracted" / basename / "translatable_flat.json"
+            input_json = self.extracted_root / basename / "translatable_flat.json"
             if not input_json.exists():
                 error_msg = f"Skipping translation for {html_name} - no extraction output"
                 self.logger.warning(f"[Pipeline] {error_msg}")
@@ -649,7 +1263,7 @@ class PipelineRunner:
                 continue
 
             # Prepare step 2 arguments  
-            output_dir = self.session_path / "translated" / basename
+            output_dir = self.translated_root / basename
             output_dir.mkdir(exist_ok=True, parents=True)
 
             args = [
@@ -670,14 +1284,11 @@ class PipelineRunner:
             success = self._execute_script("step2_translate.py", args)
             
             if success:
-                if shared_memory_file.exists():
-                    try:
-                        import json
-                        with open(shared_memory_file, 'r') as f:
-                            memory_data = json.load(f)
-                        self.logger.info(f"[Pipeline] Memory after {basename}: {len(memory_data)} entries")
-                    except Exception as e:
-                        self.logger.warning(f"[Pipeline] Could not read memory file: {e}")
+                try:
+                    memory_size = shared_memory_file.stat().st_size
+                    self.logger.info(f"[Pipeline] Memory after {basename}: {memory_size:,} bytes")
+                except OSError as e:
+                    self.logger.warning(f"[Pipeline] Could not stat memory file: {e}")
                
                 self.results['files_translated'] += 1
                 self.logger.info(f"[Pipeline] Step 2 completed for {html_name}")
@@ -692,175 +1303,32 @@ class PipelineRunner:
                 tracker.update(session_id, 3, "Refining translations with GPT (full harmonization)...")
             elif refinement_mode == "refinement":
                 tracker.update(session_id, 3, "Refining translations (without harmonization)...")
-                
             
-            
-            for html_name in html_filenames:
-                basename = Path(html_name).stem
-                
-                # Check if step 2 outputs exist
-                context_json = self.session_path / "extracted" / basename / "translatable_flat_sentences.json"
-                segments_json = self.session_path / "translated" / basename / "segments_only.json"
-                
-                if not (context_json.exists() and segments_json.exists()):
-                    error_msg = f"Skipping GPT refinement for {html_name} - missing translation outputs"
-                    self.logger.warning(f"[Pipeline] {error_msg}")
-                    self.results['errors'].append(error_msg)
-                    continue
-
-                # Prepare step 3 arguments
-                output_dir = self.session_path / "refined" / basename
-                output_dir.mkdir(exist_ok=True, parents=True)
-
-                args = [
-                    "--context", str(context_json),
-                    "--translated", str(segments_json),
-                    
-                    "--primary-lang", primary_lang,
-                    "--target-lang", target_lang,
-                    "--output", str(output_dir / "openai_translations.json")
-                ]
-                if secondary_lang:
-                    args += ["--secondary-lang", secondary_lang]
-                if refinement_mode == "refinement":
-                    args.append("--skip-harmonization")
-
-                
-                self.logger.info(f"[Pipeline] Step 3: GPT refining {html_name} (mode:{refinement_mode})")
-                
-                success = self._execute_script("step3_gpt_process.py", args)
-                
-                if success:
-                    self.results['files_refined'] += 1
-                    self.logger.info(f"[Pipeline] Step 3 completed for {html_name}")
-                else:
-                    error_msg = f"GPT refinement failed for {html_name} (OpenAI API key may be missing/invalid)"
-                    self.logger.error(f"[Pipeline] {error_msg}")
-                    self.results['errors'].append(error_msg)
+            # Step 3 runs one subprocess per file, so files are refined concurrently
+            self._run_per_file(
+                partial(
+                    self._refine_one,
+                    primary_lang=primary_lang,
+                    secondary_lang=secondary_lang,
+                    target_lang=target_lang,
+                    refinement_mode=refinement_mode
+                ),
+                html_filenames
+            )
         else:
             # Skip refinement step
             tracker.update(session_id, 3, "Skipping GPT refinement (disabled by user)...")
             self.logger.info("[Pipeline] Step 3: GPT refinement disabled by user configuration")
             # Set files_refined to files_translated since we're skipping this step
             self.results['files_refined'] = self.results['files_translated']
-            time.sleep(1)  # Brief pause for user to see the skip message
 
 # ═══ STEP 4: MERGE ═══
         tracker.update(session_id, 4, "Merging into final HTML/SQL files...")
         
-        for file_name in html_filenames:
-            basename = Path(file_name).stem
-            
-            # Prepare paths for merging - detect file type
-            original_file = self.session_path / "uploads" / file_name
-            file_extension = Path(file_name).suffix.lower()
-            
-            # Check for both HTML and SQL extracted templates
-            non_translatable_html = self.session_path / "extracted" / basename / "non_translatable.html"
-            non_translatable_sql = self.session_path / "extracted" / basename / "non_translatable.sql"
-            non_translatable_py = self.session_path / "extracted" / basename / "non_translatable.py"
-            non_translatable_pdf = self.session_path / "extracted" / basename / "non_translatable.pdf"
-            
-            
-            
-            # Determine which template to use
-            if non_translatable_sql.exists():
-                non_translatable_file = non_translatable_sql
-                output_extension = ".sql"
-                file_type = "SQL"
-            elif non_translatable_py.exists():
-                non_translatable_file = non_translatable_py
-                output_extension = ".py"
-                file_type = "Python"
-            elif non_translatable_pdf.exists():
-                non_translatable_file = non_translatable_pdf
-                output_extension = ".pdf"
-                file_type = "PDF"
-  
-            elif non_translatable_html.exists():
-                non_translatable_file = non_translatable_html
-                output_extension = ".html"
-                file_type = "HTML"
-            else:
-                error_msg = f"Skipping merge for {file_name} - no extracted content template found"
-                self.logger.warning(f"[Pipeline] {error_msg}")
-                self.results['errors'].append(error_msg)
-                continue
-            
-            deepl_json = self.session_path / "translated" / basename / "segments_only.json"
-            openai_json = self.session_path / "refined" / basename / "openai_translations.json"
-            
-            # Create final output directory
-            final_dir = self.session_path / "final" / basename
-            final_dir.mkdir(exist_ok=True, parents=True)
-            
-            # Check what files are available for merging
-            has_extracted = non_translatable_file.exists()
-            has_deepl = deepl_json.exists()
-            has_openai = openai_json.exists() and enable_refinement  # Only consider OpenAI if refinement was enabled
-            
-            # Determine merge strategy based on available files
-            merge_success = False
-            
-            if has_deepl and has_openai:
-                # Full merge with both translation services
-                args = [
-                    "--input", str(non_translatable_file),
-                    "--deepl", str(deepl_json),
-                    "--openai", str(openai_json),
-                    "--output-deepl", str(final_dir / f"final_deepl_{target_lang.lower()}{output_extension}"),
-                    "--output-openai", str(final_dir / f"final_openai_{target_lang.lower()}{output_extension}"),
-                    "--target-lang", target_lang.lower(),
-                    "--both"
-                ]
-                
-                self.logger.info(f"[Pipeline] Step 4: Full merge (DeepL + OpenAI) for {file_name} ({file_type})")
-                merge_success = self._execute_script("step4_merge.py", args)
-                
-            elif has_deepl:
-                # DeepL-only merge (either refinement disabled or failed)
-                args = [
-                    "--input", str(non_translatable_file),
-                    "--deepl", str(deepl_json),
-                    "--output-deepl", str(final_dir / f"final_deepl_{target_lang.lower()}{output_extension}"),
-                    "--target-lang", target_lang.lower()
-                ]
-                
-                refinement_status = "refinement disabled" if not enable_refinement else "OpenAI refinement failed"
-                self.logger.info(f"[Pipeline] Step 4: DeepL-only merge ({refinement_status}) for {file_name} ({file_type})")
-                merge_success = self._execute_script("step4_merge.py", args)
-                
-            else:
-                # Fallback: copy original file with a note
-                try:
-                    fallback_path = final_dir / f"original_{basename}{file_extension}"
-                    import shutil
-                    shutil.copy2(original_file, fallback_path)
-                    
-                    # Add a note about processing status
-                    note_path = final_dir / f"processing_note_{basename}.txt"
-                    with open(note_path, 'w') as f:
-                        f.write(f"Processing Status for {file_name}:\n")
-                        f.write(f"- Content extraction: {'✓' if has_extracted else '✗'}\n")
-                        f.write(f"- Translation: {'✗ (API issues)' if not has_deepl else '✓'}\n")
-                        refinement_note = "✗ (disabled)" if not enable_refinement else "✗ (API issues)"
-                        f.write(f"- GPT refinement: {refinement_note}\n")
-                        f.write(f"\nOriginal file preserved as: original_{basename}{file_extension}\n")
-                    
-                    merge_success = True
-                    self.logger.info(f"[Pipeline] Step 4: Fallback preservation for {file_name}")
-                    
-                except Exception as e:
-                    self.logger.error(f"[Pipeline] Failed to preserve original file {file_name}: {e}")
-                    merge_success = False
-            
-            if merge_success:
-                self.results['files_merged'] += 1
-                self.logger.info(f"[Pipeline] Step 4 completed for {file_name}")
-            else:
-                error_msg = f"Final merge failed for {file_name}"
-                self.logger.error(f"[Pipeline] {error_msg}")
-                self.results['errors'].append(error_msg)
+        self._run_per_file(
+            partial(self._merge_one, target_lang=target_lang, enable_refinement=enable_refinement),
+            html_filenames
+        )
 
 
         # ═══ GENERATE MEMORY EFFICIENCY REPORT ═══
@@ -878,13 +1346,17 @@ class PipelineRunner:
         for html_name in html_filenames:
             basename = Path(html_name).stem
             # Only create per-file ZIP if we have a final directory for this file
-            final_dir = self.session_path / "final" / basename
-            if final_dir.exists() and any(final_dir.iterdir()):
-                self._create_per_file_zip(basename, self.session_path / "results", self.session_path / "final")
+            final_dir = self.final_root / basename
+            try:
+                has_outputs = any(final_dir.iterdir())
+            except FileNotFoundError:
+                has_outputs = False
+            if has_outputs:
+                self._create_per_file_zip(basename, self.results_root, self.final_root)
 
         # Create comprehensive batch output ZIP
         self.logger.info("[Pipeline] Creating comprehensive batch output ZIP...")
-        batch_zip_success = self._create_batch_output_zip(self.session_path / "results")
+        batch_zip_success = self._create_batch_output_zip(self.results_root)
 
         
         
@@ -908,10 +1380,7 @@ class PipelineRunner:
         self.logger.info(f"  Successfully merged: {self.results['files_merged']}")
         self.logger.info(f"  Errors encountered: {error_count}")
 
-        # CRITICAL FIX: Ensure filesystem sync before marking complete
-        if hasattr(os, 'sync'):
-            os.sync()  # Force filesystem to flush all pending writes
-        time.sleep(0.2)  # Give filesystem a moment to complete operations
+        # ZIPs were fsync'ed as they were written, so they are durable here
 
         if error_count == 0:
             # Perfect success - ZIPs are now guaranteed to be on disk
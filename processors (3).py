@@ -1,11 +1,18 @@
 import sys
 import spacy
 import subprocess
+from functools import lru_cache
 from pypinyin import lazy_pinyin
 from .detection import SPACY_MODELS, detectis_exception_language, contains_chinese
 
+# Pipeline components whose output is never read. Tagger/attribute_ruler
+# (token.pos_), ner (token.ent_type_) and parser (doc.sents) must stay.
+DISABLED_PIPES = ["lemmatizer"]
 
+
+@lru_cache(maxsize=16)
 def load_spacy_model(lang_code):
+    """Load (and cache per process) the spaCy pipeline for lang_code."""
     if lang_code not in SPACY_MODELS:
         print(f"Unsupported language '{lang_code}'. Choose from: {', '.join(SPACY_MODELS)}.")
         sys.exit(1)
@@ -19,6 +26,11 @@ def load_spacy_model(lang_code):
         subprocess.run(["python", "-m", "spacy", "download", model_name], check=True)
         nlp = spacy.load(model_name)
 
+    # Not every model ships every component (e.g. xx_ent_wiki_sm)
+    for pipe_name in DISABLED_PIPES:
+        if pipe_name in nlp.pipe_names:
+            nlp.disable_pipe(pipe_name)
+
     # Minimal addition: ensure sentence segmentation
     if "parser" not in nlp.pipe_names and "sentencizer" not in nlp.pipe_names:
         nlp.add_pipe("sentencizer", first=True)
@@ -29,33 +41,61 @@ def load_spacy_model(lang_code):
 def process_text_block(block_id, text, default_nlp):
     lang_code = detectis_exception_language(text)
     nlp = default_nlp if not lang_code else load_spacy_model(lang_code)
-    detected_language = lang_code or "default"
-    
+    return _build_block_output(block_id, nlp(text), lang_code or "default")
+
+
+def process_text_blocks(blocks, default_nlp, batch_size=64):
+    """
+    Batch counterpart of process_text_block.
+
+    Takes a list of (block_id, text) pairs, groups them by detected exception
+    language and parses each group with a single nlp.pipe() call. Returns a
+    list of (structured, flattened, sentence_tokens) in input order.
+    """
+    groups = {}
+    for index, (_, text) in enumerate(blocks):
+        groups.setdefault(detectis_exception_language(text), []).append(index)
+
+    results = [None] * len(blocks)
+    for lang_code, indices in groups.items():
+        nlp = default_nlp if not lang_code else load_spacy_model(lang_code)
+        docs = nlp.pipe((blocks[i][1] for i in indices), batch_size=batch_size)
+        for i, doc in zip(indices, docs):
+            results[i] = _build_block_output(blocks[i][0], doc, lang_code or "default")
+    return results
+
+
+def _build_block_output(block_id, doc, detected_language):
     structured = {}
     flattened = {}
     sentence_tokens = []
+    # Hot loop: bind the append and build ids by concatenation off fixed prefixes
+    add_sentence = sentence_tokens.append
+    sentence_prefix = f"{block_id}_S"
 
-    doc = nlp(text)
     for s_idx, sent in enumerate(doc.sents, 1):
-        s_key = f"S{s_idx}"
-        sentence_id = f"{block_id}_{s_key}"
+        s_num = str(s_idx)
+        s_key = "S" + s_num
+        sentence_id = sentence_prefix + s_num
+        word_prefix = sentence_id + "_W"
         sentence_text = sent.text
         flattened[sentence_id] = sentence_text
-        structured[s_key] = {"text": sentence_text, "words": {}}
-        sentence_tokens.append((sentence_id, sentence_text))
+        words = {}
+        structured[s_key] = {"text": sentence_text, "words": words}
+        add_sentence((sentence_id, sentence_text))
 
         for w_idx, token in enumerate(sent, 1):
-            w_key = f"W{w_idx}"
-            word_id = f"{sentence_id}_{w_key}"
-            flattened[word_id] = token.text
-            structured[s_key]["words"][w_key] = {  # Keep `{` on the same line
-               "text": token.text,
+            w_num = str(w_idx)
+            token_text = token.text
+            flattened[word_prefix + w_num] = token_text
+            words["W" + w_num] = {
+               "text": token_text,
                "pos": token.pos_,
                "language": detected_language,
                "ent": token.ent_type_ or None,
                "pinyin": (
-                  " ".join(lazy_pinyin(token.text)) 
-                  if contains_chinese(token.text) 
+                  " ".join(lazy_pinyin(token_text)) 
+                  if contains_chinese(token_text) 
                   else None
                )
             }
@@ -1,6 +1,9 @@
 import os
 import sys
 import argparse
+import multiprocessing
+import traceback
+from pathlib import Path
 from language.processors import load_spacy_model
 from utils.html_extractor import extract_translatable_html
 from utils.output_generator import generate_output_files
@@ -20,31 +23,19 @@ SPACY_MODELS = {
     "xx": "xx_ent_wiki_sm"
 }
 
-def main():
-    SUPPORTED_LANGS = ", ".join(sorted(SPACY_MODELS.keys()))
-
-    parser = argparse.ArgumentParser(
-        description="Extract translatable text from HTML, SQL, or Python files.",
-        formatter_class=argparse.RawTextHelpFormatter
-    )
-    
-    # Change input_file to accept multiple files
-    parser.add_argument("input_files", nargs='+', help="Path(s) to the file(s) to process")
-    parser.add_argument("--output-dir", default=".", help="Output directory for extracted files")
-    parser.add_argument("--file-type", choices=["html", "sql", "python"], default="html", 
-                        help="Type of file to process")
-    parser.add_argument("--lang", choices=SPACY_MODELS.keys(), required=True, 
-                        help=f"Primary language code: {SUPPORTED_LANGS}")
-    parser.add_argument("--secondary-lang", choices=SPACY_MODELS.keys(), 
-                        help="Optional secondary language code")
+def _output_dir_for(input_file, args):
+    """Per-file output directory: <output-root>/<stem> when batching, else --output-dir."""
+    if args.output_root:
+        return os.path.join(args.output_root, Path(input_file).stem)
+    return args.output_dir
 
-    args = parser.parse_args()
 
-    if args.secondary_lang and args.secondary_lang == args.lang:
-        parser.error("Primary and secondary languages cannot be the same!")
+def _process_one(input_file, args):
+    """Extract one input file. Returns True on success."""
+    output_dir = _output_dir_for(input_file, args)
+    try:
+        os.makedirs(output_dir, exist_ok=True)
 
-    # Process each input file
-    for input_file in args.input_files:
         # Auto-detect file type if not specified
         if args.file_type == "html" and input_file.endswith(('.py', '.pyw', '.jinja', '.jinja2', '.j2')):
             actual_file_type = "python"
@@ -64,9 +55,9 @@ def main():
                 input_file,
                 args.lang,
                 args.secondary_lang,
-                args.output_dir
+                output_dir
             )
-            generate_output_files(structured, flattened, soup, args.output_dir)
+            generate_output_files(structured, flattened, soup, output_dir)
             
         elif actual_file_type == "sql":
             from extractors.sql_extractor import extract_translatable_sql
@@ -74,7 +65,7 @@ def main():
                 input_file,
                 args.lang,
                 secondary_lang=args.secondary_lang,
-                output_dir=args.output_dir
+                output_dir=output_dir
             )
             
         elif actual_file_type == "python":
@@ -83,19 +74,90 @@ def main():
                 input_file,
                 args.lang,
                 secondary_lang=args.secondary_lang,
-                output_dir=args.output_dir
+                output_dir=output_dir
             )
+    except Exception:
+        print(f"❌ Failed to process {input_file}:", file=sys.stderr)
+        traceback.print_exc()
+        return False
 
-        # Determine output file extension
-        if actual_file_type == "html":
-            output_ext = "html"
-        elif actual_file_type == "sql":
-            output_ext = "sql"
-        elif actual_file_type == "python":
-            output_ext = "py"
-        
-        print(f"✅ Processed {input_file}: saved translatable_flat.json, translatable_structured.json, " +
-              f"translatable_flat_sentences.json, and non_translatable.{output_ext} in {args.output_dir}")
+    # Determine output file extension
+    if actual_file_type == "html":
+        output_ext = "html"
+    elif actual_file_type == "sql":
+        output_ext = "sql"
+    elif actual_file_type == "python":
+        output_ext = "py"
+    
+    print(f"✅ Processed {input_file}: saved translatable_flat.json, translatable_structured.json, " +
+          f"translatable_flat_sentences.json, and non_translatable.{output_ext} in {output_dir}")
+    return True
+
+
+def _uses_secondary_model(input_file, file_type):
+    """True when the file goes to the SQL/Python extractors, which take secondary_lang."""
+    return file_type != "html" or input_file.endswith(('.py', '.pyw', '.jinja', '.jinja2', '.j2', '.sql'))
+
+
+def _warm_models(args):
+    """Load the spaCy pipelines the batch needs once, before the per-file loop."""
+    load_spacy_model(args.lang)
+    if args.secondary_lang and any(
+        _uses_secondary_model(input_file, args.file_type) for input_file in args.input_files
+    ):
+        load_spacy_model(args.secondary_lang)
+
+
+def main(argv=None):
+    SUPPORTED_LANGS = ", ".join(sorted(SPACY_MODELS.keys()))
+
+    parser = argparse.ArgumentParser(
+        description="Extract translatable text from HTML, SQL, or Python files.",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    
+    # Change input_file to accept multiple files
+    parser.add_argument("input_files", nargs='+', help="Path(s) to the file(s) to process")
+    parser.add_argument("--output-dir", default=".", help="Output directory for extracted files")
+    parser.add_argument("--output-root",
+                        help="Write each input's outputs to <output-root>/<file stem>/ (overrides --output-dir)")
+    parser.add_argument("--file-type", choices=["html", "sql", "python"], default="html", 
+                        help="Type of file to process")
+    parser.add_argument("--lang", choices=SPACY_MODELS.keys(), required=True, 
+                        help=f"Primary language code: {SUPPORTED_LANGS}")
+    parser.add_argument("--secondary-lang", choices=SPACY_MODELS.keys(), 
+                        help="Optional secondary language code")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Number of worker processes for multiple input files (default: 1)")
+
+    args = parser.parse_args(argv)
+
+    if args.secondary_lang and args.secondary_lang == args.lang:
+        parser.error("Primary and secondary languages cannot be the same!")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    # load_spacy_model is cached per process, so every file below reuses these.
+    # On Linux the pool forks, so its workers inherit the warmed pipelines;
+    # elsewhere the platform default (spawn on macOS/Windows, where forking
+    # after spaCy/numpy are loaded is unsafe) loads them again per worker.
+    _warm_models(args)
+
+    # Process each input file; one failure does not stop the rest of the batch
+    jobs = min(args.jobs, len(args.input_files))
+    if jobs > 1:
+        context = multiprocessing.get_context("fork") if sys.platform.startswith("linux") else multiprocessing
+        with context.Pool(processes=jobs) as pool:
+            results = pool.starmap(_process_one, [(input_file, args) for input_file in args.input_files])
+    else:
+        results = [_process_one(input_file, args) for input_file in args.input_files]
+    failed = [input_file for input_file, ok in zip(args.input_files, results) if not ok]
+    if failed:
+        print(f"❌ Extraction failed for {len(failed)}/{len(args.input_files)} file(s): {', '.join(failed)}",
+              file=sys.stderr)
+        return 1
+
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
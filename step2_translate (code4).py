@@ -4,10 +4,232 @@ import deepl
 import argparse
 import regex as re 
 import hashlib
+import sqlite3
 from pathlib import Path
 from collections import defaultdict
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up; the stdlib json module is the fallback
+    orjson = None
+
+try:
+    import xxhash
+except ImportError:  # Optional speed-up; MD5 keeps the original memory keys
+    xxhash = None
+
+try:
+    import msgpack
+except ImportError:  # Only needed for --memory-format msgpack
+    msgpack = None
+
+try:
+    import text_utils as _text_utils
+except ImportError:  # Optional Cython build of create_content_hash (text_utils.pyx)
+    _text_utils = None
+
+# DeepL batches are independent HTTPS requests; this many are kept in flight
+MAX_TRANSLATION_WORKERS = 8
+
+# Memory keys embed the hash scheme so xxh3 and MD5 digests never collide;
+# "hash" is the historical MD5 tag, which keeps existing memory files valid
+CONTENT_HASH_SCHEME = "xxh3" if xxhash is not None else "hash"
+
+# Per-file memory stats journal, one JSON line per translated file
+BATCH_STATS_JOURNAL = "memory_usage_batch.jsonl"
+
+# Translation memory storage formats (see load_translation_memory); without
+# --memory-format the format follows the file suffix
+MEMORY_FORMATS = ("json", "jsonl", "msgpack", "sqlite")
+SQLITE_MEMORY_SUFFIXES = (".sqlite", ".db")
+MSGPACK_MEMORY_SUFFIXES = (".msgpack", ".mpk")
+
+# Per-process cache of loaded memories: abspath -> (file signature, dict)
+_MEMORY_CACHE = {}
+MAX_CACHED_MEMORIES = 4
+
+# Shared read-only default for blocks without segments; never mutate
+_EMPTY = {}
+
+_WS_RE = re.compile(r'\s+')
+_LEAD_RE = re.compile(r'^(.*?):\s*')
+_NONWORD_RE = re.compile(r'[^\p{L}\p{N}\s=+-]', flags=re.UNICODE)
+
+
+def load_json(path):
+    """Read a JSON file, using orjson when it is installed."""
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def dump_json(obj, path, indent=True):
+    """Write obj as UTF-8 JSON (non-ASCII kept as-is), using orjson when installed."""
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0))
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2 if indent else None, ensure_ascii=False)
+
+
+def _encode_json_line(obj):
+    if orjson is not None:
+        return orjson.dumps(obj) + b"\n"
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _connect_memory_db(memory_file):
+    """Open (creating if needed) a SQLite translation memory."""
+    conn = sqlite3.connect(memory_file)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS memory (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    return conn
+
+
+def _append_json_lines(path, payload):
+    """Append encoded JSON lines to a journal file."""
+    with open(path, "a+b") as f:
+        # Never glue new lines onto a torn last line
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                payload = b"\n" + payload
+        f.write(payload)
+
+
+def resolve_memory_format(memory_file, memory_format=None):
+    """Return memory_format, or the format implied by memory_file's suffix."""
+    if memory_format:
+        if memory_format not in MEMORY_FORMATS:
+            raise ValueError(f"Unknown memory format '{memory_format}'; choose from {', '.join(MEMORY_FORMATS)}")
+        return memory_format
+    name = str(memory_file)
+    if name.endswith(".jsonl"):
+        return "jsonl"
+    if name.endswith(SQLITE_MEMORY_SUFFIXES):
+        return "sqlite"
+    if name.endswith(MSGPACK_MEMORY_SUFFIXES):
+        return "msgpack"
+    return "json"
+
+
+def _require_msgpack():
+    if msgpack is None:
+        raise ValueError("The msgpack memory format needs the 'msgpack' package (pip install msgpack)")
+
+
+def load_translation_memory(memory_file, memory_format=None):
+    """
+    Load a translation memory file into a {memory_key: translation} dict.
+
+    jsonl: append-only journal with one {"key", "text"} object per line
+    (later lines win). sqlite: a single key/value table. msgpack: one packed
+    map (strings stored as length-prefixed UTF-8, no escaping). json: a single
+    JSON object.
+    """
+    memory_format = resolve_memory_format(memory_file, memory_format)
+    if memory_format == "sqlite":
+        with closing(_connect_memory_db(memory_file)) as conn:
+            return dict(conn.execute("SELECT key, value FROM memory"))
+    if memory_format == "msgpack":
+        _require_msgpack()
+        with open(memory_file, "rb") as f:
+            return msgpack.unpackb(f.read(), raw=False)
+    if memory_format == "json":
+        return load_json(memory_file)
+
+    translation_memory = {}
+    decode = orjson.loads if orjson is not None else json.loads
+    with open(memory_file, "rb") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = decode(line)
+            except ValueError:
+                # A crash mid-append can leave a torn last line; keep the rest
+                print(f"⚠️  Skipping unreadable memory line {line_no} in {memory_file}")
+                continue
+            translation_memory[entry["key"]] = entry["text"]
+    return translation_memory
+
+
+def _memory_signature(memory_file):
+    """(mtime_ns, size) of the memory file, plus its SQLite WAL when present."""
+    signature = []
+    for path in (memory_file, f"{memory_file}-wal"):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+def get_translation_memory(memory_file, memory_format=None):
+    """
+    Return the translation memory for memory_file, loading it from disk only
+    when this process has not seen the current version of the file yet.
+
+    Step 2 runs in-process for every file of a batch, all sharing one memory
+    file; the cache turns N full loads into one. An external write changes
+    the file's mtime/size and forces a reload.
+    """
+    key = os.path.abspath(memory_file)
+    signature = _memory_signature(memory_file)
+    cached = _MEMORY_CACHE.pop(key, None)
+    if cached is not None and cached[0] == signature:
+        translation_memory = cached[1]
+    else:
+        translation_memory = load_translation_memory(memory_file, memory_format)
+    _remember_translation_memory(memory_file, translation_memory, signature)
+    return translation_memory
 
 
+def _remember_translation_memory(memory_file, translation_memory, signature=None):
+    """Cache translation_memory as the current content of memory_file."""
+    key = os.path.abspath(memory_file)
+    _MEMORY_CACHE.pop(key, None)
+    _MEMORY_CACHE[key] = (signature or _memory_signature(memory_file), translation_memory)
+    # Long-lived worker processes see one memory per session; keep the newest
+    while len(_MEMORY_CACHE) > MAX_CACHED_MEMORIES:
+        del _MEMORY_CACHE[next(iter(_MEMORY_CACHE))]
+
+
+def save_translation_memory(memory_file, translation_memory, new_entries, memory_format=None):
+    """
+    Persist new memory entries. A jsonl journal only gets the new entries
+    appended and a sqlite memory only has them upserted; msgpack and json
+    memories are rewritten in full.
+    """
+    memory_format = resolve_memory_format(memory_file, memory_format)
+    if memory_format == "sqlite":
+        with closing(_connect_memory_db(memory_file)) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO memory (key, value) VALUES (?, ?)",
+                new_entries.items()
+            )
+    elif memory_format == "jsonl":
+        _append_json_lines(memory_file, b"".join(
+            _encode_json_line({"key": key, "text": text})
+            for key, text in new_entries.items()
+        ))
+    elif memory_format == "msgpack":
+        _require_msgpack()
+        # Write aside and swap in, so a crash never leaves a truncated memory
+        tmp_file = f"{memory_file}.tmp"
+        with open(tmp_file, "wb") as f:
+            f.write(msgpack.packb(translation_memory, use_bin_type=True))
+        os.replace(tmp_file, memory_file)
+    else:
+        dump_json(translation_memory, memory_file)
+
 
 def track_memory_usage(
     translation_memory, 
@@ -15,7 +237,9 @@ def track_memory_usage(
     translatable_map, 
     output_dir, 
     input_filename,
-    all_segments_info
+    all_segments_info,
+    cache_hits=None,
+    cache_misses=None
 ):
     """
     Track and save memory usage statistics for this file
@@ -27,28 +251,30 @@ def track_memory_usage(
         output_dir: Directory to save stats
         input_filename: Name of input file being processed
         all_segments_info: Dict with complete segment info including cache hit status
+        cache_hits/cache_misses: Counts already tallied by the caller; derived
+            from all_segments_info when not given
     """
     
-    # Calculate cache hits and misses
-    cache_hits = 0
-    cache_misses = 0
-    
-    for token, (text, memory_key, was_cache_hit) in all_segments_info.items():
-        if was_cache_hit:
-            cache_hits += 1
-        else:
-            cache_misses += 1
-    
     total_segments = len(all_segments_info)
+    if cache_hits is None:
+        cache_hits = sum(1 for info in all_segments_info.values() if info[2])
+    if cache_misses is None:
+        cache_misses = total_segments - cache_hits
+
     hit_rate = (cache_hits / total_segments * 100) if total_segments > 0 else 0
     memory_size = len(translation_memory)
 
     
     
+    try:
+        timestamp = str(os.stat(input_filename).st_mtime)
+    except OSError:
+        timestamp = "unknown"
+
     # Create stats dictionary
     stats = {
         'file': input_filename,
-        'timestamp': str(Path(input_filename).stat().st_mtime) if Path(input_filename).exists() else "unknown",
+        'timestamp': timestamp,
         'total_segments': total_segments,
         'cache_hits': cache_hits,
         'cache_misses': cache_misses,
@@ -65,46 +291,12 @@ def track_memory_usage(
     file_basename = Path(input_filename).stem
     stats_file = output_path / f"{file_basename}_memory_stats.json"
     
-    with open(stats_file, 'w', encoding='utf-8') as f:
-        json.dump(stats, f, indent=2, ensure_ascii=False)
-    
-    # Update batch stats file (shared across all files)
-    batch_stats_file = output_path.parent / "memory_usage_batch.json"
-    
-    if batch_stats_file.exists():
-        with open(batch_stats_file, 'r', encoding='utf-8') as f:
-            batch_data = json.load(f)
-    else:
-        batch_data = {
-            'processing_order': [],
-            'cumulative_stats': [],
-            'summary': {}
-        }
-    
-    # Update processing order
-    stats['processing_order'] = len(batch_data['processing_order']) + 1
-    batch_data['processing_order'].append(input_filename)
-    batch_data['cumulative_stats'].append(stats)
-    
-    # Calculate summary
-    total_files = len(batch_data['cumulative_stats'])
-    total_segments_all = sum(s['total_segments'] for s in batch_data['cumulative_stats'])
-    total_hits_all = sum(s['cache_hits'] for s in batch_data['cumulative_stats'])
-    total_misses_all = sum(s['cache_misses'] for s in batch_data['cumulative_stats'])
+    dump_json(stats, stats_file)
     
-    batch_data['summary'] = {
-        'total_files_processed': total_files,
-        'total_segments_processed': total_segments_all,
-        'total_cache_hits': total_hits_all,
-        'total_cache_misses': total_misses_all,
-        'overall_hit_rate_percent': round((total_hits_all / total_segments_all * 100) if total_segments_all > 0 else 0, 2),
-        'final_memory_size': memory_size,
-        'last_updated': str(Path().cwd())  # Simple timestamp
-    }
-    
-    # Save batch stats
-    with open(batch_stats_file, 'w', encoding='utf-8') as f:
-        json.dump(batch_data, f, indent=2, ensure_ascii=False)
+    # Append to the batch stats journal (shared across all files); the
+    # summary is computed on demand by compute_summary()
+    batch_stats_file = output_path.parent / BATCH_STATS_JOURNAL
+    _append_json_lines(batch_stats_file, _encode_json_line(stats))
     
     # Print stats to console
     print(f"📊 Memory stats for {Path(input_filename).stem}:")
@@ -113,11 +305,78 @@ def track_memory_usage(
     
     return stats
 
+def compute_summary(batch_stats_file):
+    """
+    Stream a memory_usage_batch.jsonl journal once and return the batch view
+    ({'processing_order', 'cumulative_stats', 'summary'}) that used to be
+    rewritten to memory_usage_batch.json after every file.
+    """
+    decode = orjson.loads if orjson is not None else json.loads
+    processing_order = []
+    cumulative_stats = []
+    total_segments_all = total_hits_all = total_misses_all = 0
+    final_memory_size = 0
+
+    with open(batch_stats_file, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                stats = decode(line)
+            except ValueError:
+                continue  # torn last line from an interrupted run
+            stats['processing_order'] = len(cumulative_stats) + 1
+            processing_order.append(stats['file'])
+            cumulative_stats.append(stats)
+            total_segments_all += stats['total_segments']
+            total_hits_all += stats['cache_hits']
+            total_misses_all += stats['cache_misses']
+            final_memory_size = stats['memory_size_after']
+
+    return {
+        'processing_order': processing_order,
+        'cumulative_stats': cumulative_stats,
+        'summary': {
+            'total_files_processed': len(cumulative_stats),
+            'total_segments_processed': total_segments_all,
+            'total_cache_hits': total_hits_all,
+            'total_cache_misses': total_misses_all,
+            'overall_hit_rate_percent': round((total_hits_all / total_segments_all * 100) if total_segments_all > 0 else 0, 2),
+            'final_memory_size': final_memory_size,
+            'last_updated': str(Path().cwd())  # Simple timestamp
+        }
+    }
+
+
+def clean_text(text):
+    """Clean text for language detection"""
+    text = _LEAD_RE.sub('', text)
+    text = _NONWORD_RE.sub(' ', text)
+    text = _WS_RE.sub(' ', text).strip()
+    return text[:500]
+
+
 def create_content_hash(text):
     """Create a consistent hash for content-based memory keys"""
     # Normalize text for consistent hashing
-    normalized = re.sub(r'\s+', ' ', text.strip().lower())
-    return hashlib.md5(normalized.encode('utf-8')).hexdigest()[:12]
+    normalized = _WS_RE.sub(' ', text.strip().lower()).encode('utf-8')
+    if xxhash is not None:
+        return xxhash.xxh3_64_hexdigest(normalized)
+    return hashlib.md5(normalized).hexdigest()[:12]
+
+
+# Swap in the compiled hash only if it produces the same memory keys
+if _text_utils is not None and _text_utils.CONTENT_HASH_SCHEME == CONTENT_HASH_SCHEME:
+    create_content_hash = _text_utils.create_content_hash
+
+
+def _iter_items(json_data):
+    """Yield (token, text, kind) for every block text and segment, in document order."""
+    for block_id, block_data in json_data.items():
+        if "text" in block_data:
+            yield block_id, block_data["text"], "block"
+        for segment_id, segment_text in block_data.get("segments", _EMPTY).items():
+            yield f"{block_id}_{segment_id}", segment_text, "segment"
 
 
 def create_efficient_translatable_map(
@@ -128,11 +387,15 @@ def create_efficient_translatable_map(
     secondary_lang=None, 
     memory_file=None,
     update_memory=False,
-    metrics=None
+    metrics=None,
+    verbose=False,
+    memory_format=None
 ):
     """
     Creates a translation map with language validation and improved memory.
     Memory keys are now content-based hashes to identify identical blocks across files.
+    Per-token cache hits are only printed when verbose is set; the hit/miss
+    summary is always printed.
     """
     if target_lang == "PT":
         target_lang = "PT-PT"
@@ -143,177 +406,199 @@ def create_efficient_translatable_map(
     initial_memory_size = 0
     if memory_file and os.path.exists(memory_file):
         try:
-            with open(memory_file, 'r', encoding='utf-8') as f:
-                translation_memory = json.load(f)
+            translation_memory = get_translation_memory(memory_file, memory_format)
             initial_memory_size = len(translation_memory)  # NEW LINE
             print(f"🧠 Loaded {len(translation_memory)} cached translations from memory")
         except json.JSONDecodeError:
             print(f"⚠️  Corrupted memory file - resetting {memory_file}")
             translation_memory = {}
             # Auto-recover by recreating
-            with open(memory_file, 'w', encoding='utf-8') as f:
-                json.dump({}, f)   
+            dump_json({}, memory_file, indent=False)
 
     
     # Prepare translation data structures
     translatable_map = {}
-    texts_to_translate = []
     token_indices = []
     original_texts = {}
     cache_hits = 0
     cache_misses = 0
+    new_memory_entries = {}
 
     all_segments_info = {}
 
-    # Process all blocks and segments
-    for block_id, block_data in json_data.items():
-        if "text" in block_data:
-            text = block_data["text"]
-            token = block_id
-            
-            # Create content-based memory key (improved for block deduplication)
-            content_hash = create_content_hash(text)
-            memory_key = f"{primary_lang or 'any'}-{target_lang}:hash:{content_hash}"
-            
-            if memory_key in translation_memory:
-                translatable_map[token] = translation_memory[memory_key]
-                cache_hits += 1
-                all_segments_info[token] = (text, memory_key, True)
-                if metrics: metrics["cache_hits"] += 1
-                print(f"💾 Cache hit for block: {token}")
-            else:
-                texts_to_translate.append(text)
-                token_indices.append(token)
-                original_texts[token] = (text, memory_key)
-                cache_misses += 1
-                all_segments_info[token] = (text, memory_key, False)
-                if metrics: 
-                    metrics["cache_misses"] += 1
-                    metrics["total_characters"] += len(text) 
-            
-        if "segments" in block_data:
-            for segment_id, segment_text in block_data["segments"].items():
-                token = f"{block_id}_{segment_id}"
-                
-                # Create content-based memory key for segments
-                content_hash = create_content_hash(segment_text)
-                memory_key = f"{primary_lang or 'any'}-{target_lang}:hash:{content_hash}"
-                
-                if memory_key in translation_memory:
-                    translatable_map[token] = translation_memory[memory_key]
-                    cache_hits += 1
-                    all_segments_info[token] = (segment_text, memory_key, True)
-                    if metrics: metrics["cache_hits"] += 1
-                    print(f"💾 Cache hit for segment: {token}")
-                else:
-                    texts_to_translate.append(segment_text)
-                    token_indices.append(token)
-                    original_texts[token] = (segment_text, memory_key)
-                    cache_misses += 1
-                    all_segments_info[token] = (segment_text, memory_key, False)
-                    if metrics: metrics["cache_misses"] += 1
-                
-                # Track ALL characters processed (both hits and misses)
-                if metrics:
-                    metrics["total_characters"] += len(segment_text)
-                    
+    # Process all blocks and segments in one flat pass; tally in locals and
+    # fold into metrics once at the end
+    key_prefix = f"{primary_lang or 'any'}-{target_lang}:{CONTENT_HASH_SCHEME}:"
+    for token, text, kind in _iter_items(json_data):
+        # Create content-based memory key (improved for block deduplication)
+        memory_key = key_prefix + create_content_hash(text)
+
+        if memory_key in translation_memory:
+            translatable_map[token] = translation_memory[memory_key]
+            cache_hits += 1
+            all_segments_info[token] = (text, memory_key, True)
+            if verbose:
+                print(f"💾 Cache hit for {kind}: {token}")
+        else:
+            token_indices.append(token)
+            original_texts[token] = (text, memory_key)
+            cache_misses += 1
+            all_segments_info[token] = (text, memory_key, False)
+
+    if metrics:
+        metrics["cache_hits"] += cache_hits
+        metrics["cache_misses"] += cache_misses
 
     print(f"📊 Memory statistics: {cache_hits} hits, {cache_misses} misses")
     if cache_hits + cache_misses > 0:
         hit_rate = (cache_hits / (cache_hits + cache_misses)) * 100
         print(f"📊 Cache hit rate: {hit_rate:.1f}%")
     
-    def clean_text(text):
-        """Clean text for language detection"""
-        text = re.sub(r'^(.*?):\s*', '', text)
-        text = re.sub(r'[^\p{L}\p{N}\s=+-]', ' ', text, flags=re.UNICODE)
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text[:500]
-        
+    # The same text can show up in many blocks/segments: translate each
+    # memory key once and fan the result back out to every token using it
+    unique_texts = {}
+    for token in token_indices:
+        text, memory_key = original_texts[token]
+        unique_texts.setdefault(memory_key, text)
+    unique_keys = list(unique_texts)
+    texts_to_translate = list(unique_texts.values())
+    translations_added = 0
+    # Characters actually sent to DeepL: each unique text once, like texts_translated
+    if metrics:
+        metrics["total_characters"] += sum(len(text) for text in texts_to_translate)
+    failed_translations = 0
+
     # Language-aware batch translation
     if texts_to_translate:
-        print(f"🌐 Processing {len(texts_to_translate)} new segments with language validation...")
+        print(f"🌐 Processing {len(texts_to_translate)} unique new segments "
+              f"({len(token_indices)} total) with language validation...")
         
         batch_size = 330
-        translations_added = 0
-        
-        for batch_idx in range(0, len(texts_to_translate), batch_size):
-            batch = texts_to_translate[batch_idx:batch_idx+batch_size]
-            translated_batch = []
-            detected_languages_batch = []
-        
+        allowed_langs = {lang.lower() for lang in [primary_lang, secondary_lang] if lang}
+
+        def _process_batch(batch_idx, batch):
+            """
+            Detect and translate one batch. Returns (batch_idx, translated,
+            detected, api_calls, added, failed, warnings), where failed lists the
+            batch positions whose DeepL call raised and so still hold their
+            source text. Runs on a worker thread, so warnings are returned for
+            the calling thread to print rather than printed here.
+            """
+            # Keep original text wherever detection/translation does not happen
+            translated_batch = list(batch)
+            api_calls = 0
+            added = 0
+            failed = []
+            warnings = []
+
             try:
                 # Phase 1: Language detection with cleaned text
                 detection_texts = [clean_text(text) for text in batch]
-                translation_texts = batch  # Keep original texts for translation
-                
+
                 detection_results = translator.translate_text(
                     detection_texts,
                     target_lang=target_lang,
                     preserve_formatting=True
                 )
-                if metrics: metrics["api_calls"] += 1
-
-                # Phase 2: Translation with original texts
-                for idx, detection in enumerate(detection_results):
-                    detected_lang = detection.detected_source_lang.lower()
-                    allowed_langs = {lang.lower() for lang in [primary_lang, secondary_lang] if lang}
-                    original_text = translation_texts[idx]
-                    
-
-                    if allowed_langs and detected_lang in allowed_langs:
-                        result = translator.translate_text(original_text, target_lang=target_lang)
-                        translated_batch.append(result.text)
-                        detected_languages_batch.append(detected_lang)
-                        translations_added += 1
-                    else:
-                        # Keep original text if language not in allowed list
-                        translated_batch.append(original_text)
-                        detected_languages_batch.append(detected_lang)
-
+                api_calls += 1
+                detected_languages_batch = [
+                    detection.detected_source_lang.lower() for detection in detection_results
+                ]
             except Exception as e:
-                print(f"⚠️  Translation skipped for batch (error: {str(e)[:50]}...)")
-                translated_batch.extend(batch)
-            
-            # Store results in both translatable_map and memory
-            for j in range(len(batch)):
-                global_index = batch_idx + j
-                token = token_indices[global_index]
-                original_text, memory_key = original_texts[token]
-                final_text = translated_batch[j]
-                detected_lang = detected_languages_batch[j]
-                translatable_map[token] = {        
-        "text": final_text,        
-        "detected_language": detected_lang
-                }
- 
-                
-                
-                
-                if update_memory:
+                warnings.append(f"⚠️  Translation skipped for batch (error: {str(e)[:50]}...)")
+                return (batch_idx, translated_batch, [None] * len(batch), api_calls, added,
+                        list(range(len(batch))), warnings)
+
+            # Phase 2: one translation call per allowed source language; texts
+            # in other languages keep their original text
+            language_groups = defaultdict(list)
+            if allowed_langs:
+                for idx, detected_lang in enumerate(detected_languages_batch):
+                    if detected_lang in allowed_langs:
+                        language_groups[detected_lang].append(idx)
+
+            for detected_lang, indices in language_groups.items():
+                # A failed group only affects its own texts; groups already
+                # translated (and billed) are kept
+                try:
+                    results = translator.translate_text(
+                        [batch[i] for i in indices],
+                        source_lang=detected_lang.upper(),
+                        target_lang=target_lang
+                    )
+                except Exception as e:
+                    warnings.append(f"⚠️  Translation skipped for {len(indices)} '{detected_lang}' texts "
+                                    f"(error: {str(e)[:50]}...)")
+                    failed.extend(indices)
+                    continue
+                api_calls += 1
+                for i, result in zip(indices, results):
+                    translated_batch[i] = result.text
+                added += len(indices)
+
+            return batch_idx, translated_batch, detected_languages_batch, api_calls, added, failed, warnings
+
+        # Batches are independent HTTPS calls: keep several in flight, then
+        # merge by batch_idx so the map and memory are filled in input order
+        total_batches = (len(texts_to_translate) + batch_size - 1)//batch_size
+        batch_results = []
+        with ThreadPoolExecutor(max_workers=min(MAX_TRANSLATION_WORKERS, total_batches)) as executor:
+            futures = [
+                executor.submit(_process_batch, batch_idx, texts_to_translate[batch_idx:batch_idx+batch_size])
+                for batch_idx in range(0, len(texts_to_translate), batch_size)
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                batch_results.append(result)
+                for warning in result[-1]:
+                    print(warning)
+                print(f"✅ Completed batch {result[0]//batch_size + 1}/{total_batches}")
+
+        key_to_result = {}
+        for batch_idx, translated_batch, detected_languages_batch, api_calls, added, failed, _ in sorted(
+            batch_results, key=lambda result: result[0]
+        ):
+            if metrics: metrics["api_calls"] += api_calls
+            translations_added += added
+            failed_translations += len(failed)
+            failed = set(failed)
+
+            # Store each unique result once in memory; texts whose DeepL call
+            # failed are left out so a later run retries them
+            for j, final_text in enumerate(translated_batch):
+                memory_key = unique_keys[batch_idx + j]
+                key_to_result[memory_key] = (final_text, detected_languages_batch[j])
+
+                if update_memory and j not in failed:
                     translation_memory[memory_key] = final_text
-            
-            batch_num = batch_idx//batch_size + 1
-            total_batches = (len(texts_to_translate) + batch_size - 1)//batch_size
-            print(f"✅ Completed batch {batch_num}/{total_batches}")
+                    new_memory_entries[memory_key] = final_text
+
+        for token in token_indices:
+            final_text, detected_lang = key_to_result[original_texts[token][1]]
+            translatable_map[token] = {
+                "text": final_text,
+                "detected_language": detected_lang
+            }
 
         print(f"🌐 Translation complete: {translations_added} new translations")
+        if failed_translations:
+            print(f"⚠️  {failed_translations} texts kept their source text after DeepL errors")
 
     # Update translation memory if enabled
-    if memory_file and update_memory and translation_memory:
+    if memory_file and update_memory and new_memory_entries:
         # Ensure directory exists
         memory_dir = os.path.dirname(memory_file)
         if memory_dir:
             os.makedirs(memory_dir, exist_ok=True)
         
-        
-        with open(memory_file, "w", encoding="utf-8") as f:
-            json.dump(translation_memory, f, ensure_ascii=False, indent=2)
+        save_translation_memory(memory_file, translation_memory, new_memory_entries, memory_format)
+        _remember_translation_memory(memory_file, translation_memory)
         print(f"💾 Updated translation memory: {len(translation_memory)} total entries")
 
     # Update final metrics
     if metrics:
         metrics["texts_translated"] = translations_added
+        metrics["failed_translations"] = failed_translations
         
     return translatable_map, translation_memory, original_texts, all_segments_info, metrics
     
@@ -326,7 +611,9 @@ def translate_json_file(
     secondary_lang=None, 
     memory_file=None,
     update_memory=False,
-    segment_file=None
+    segment_file=None,
+    verbose=False,
+    memory_format=None
 ):
     """Main translation function with enhanced memory support"""
     print(f"🚀 Starting translation: {input_file} -> {target_lang}")
@@ -337,7 +624,8 @@ def translate_json_file(
         "api_calls": 0,
         "texts_translated": 0,
         "cache_hits": 0,
-        "cache_misses": 0
+        "cache_misses": 0,
+        "failed_translations": 0
     }
     
     # --- Consolidated directory creation (NEW) ---
@@ -369,8 +657,7 @@ def translate_json_file(
     
     # Load input data
     try:
-        with open(input_file, "r", encoding="utf-8") as f:
-            json_data = json.load(f)
+        json_data = load_json(input_file)
         print(f"📄 Loaded {len(json_data)} blocks from {input_file}")
     except Exception as e:
         raise ValueError(f"Failed to load {input_file}: {e}")
@@ -384,7 +671,9 @@ def translate_json_file(
         secondary_lang=secondary_lang,
         memory_file=memory_file,
         update_memory=update_memory,
-        metrics=deepl_metrics
+        metrics=deepl_metrics,
+        verbose=verbose,
+        memory_format=memory_format
     )
 
     # Rebuild structure with translations
@@ -402,115 +691,34 @@ def translate_json_file(
   
                 
         
-        if "segments" in block_data:
+        segments = block_data.get("segments")
+        if segments is not None:
             translated_segments = {
                 seg_id: translatable_map.get(f"{block_id}_{seg_id}", seg_text)
-                for seg_id, seg_text in block_data["segments"].items()
+                for seg_id, seg_text in segments.items()
             }
             translated_block["segments"] = translated_segments
         
         translated_data[block_id] = translated_block
 
     # Save output (now safe since directory exists)
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(translated_data, f, indent=2, ensure_ascii=False)
+    dump_json(translated_data, output_file)
     print(f"✅ Translation completed: {output_file}")
 
     if segment_file:
+        # Every segment was translated on its own (and deduplicated) above, so
+        # the export reads those translations directly rather than splitting
+        # the block translation back apart
         segment_translations = {}
-        
         for block_id, block_data in translated_data.items():
-            if "segments" in block_data:
-                segment_count = len(block_data["segments"])
-                
-                if segment_count == 1:
-                    # Single segment: use individual translation
-                    for seg_id, seg_text in block_data["segments"].items():
-                        if isinstance(seg_text, dict) and "text" in seg_text:
-                            segment_translations[seg_id] = seg_text["text"]
-                        else:
-                            segment_translations[seg_id] = seg_text
-                
-                elif segment_count > 1:
-                    # Multiple segments: split block translation back into segments
-                    if "text" in block_data:
-                        block_translation = block_data["text"]
-                        if isinstance(block_translation, dict):
-                            block_translation = block_translation["text"]
-                        
-                        # Hybrid approach: Word count ranges + boundary detection
-                        original_segments = list(block_data["segments"].values())
-                        original_word_counts = [
-                            len((seg["text"] if isinstance(seg, dict) else seg).split()) 
-                            for seg in original_segments
-                        ]
-                        
-                        # Allow 30% flexibility for translation changes
-                        word_ranges = [(int(count * 0.7), int(count * 1.3)) for count in original_word_counts]
-                        
-                        # Split by sentences/punctuation
-                        import re
-                        potential_splits = re.split(r'(?<=[.!?;])\s+', block_translation)
-                        potential_splits = [s.strip() for s in potential_splits if s.strip()]
-                        
-                        # Try to match splits to word count ranges
-                        split_parts = []
-                        remaining_text = block_translation
-                        words_used = 0
-                        total_words = len(block_translation.split())
-                        
-                        success = True
-                        for i, (min_words, max_words) in enumerate(word_ranges):
-                            if i == len(word_ranges) - 1:  # Last segment gets all remaining
-                                split_parts.append(remaining_text.strip())
-                                break
-                                
-                            # Find best split point within word range
-                            words_so_far = 0
-                            best_split_idx = -1
-                            
-                            for j, split in enumerate(potential_splits):
-                                words_so_far += len(split.split())
-                                current_word_count = words_so_far - words_used
-                                
-                                if min_words <= current_word_count <= max_words:
-                                    best_split_idx = j
-                                    break
-                            
-                            if best_split_idx == -1:
-                                success = False
-                                break
-                            
-                            # Take splits up to best split point
-                            segment_text = " ".join(potential_splits[:best_split_idx + 1])
-                            split_parts.append(segment_text.strip())
-                            
-                            # Update remaining text and splits
-                            words_used += len(segment_text.split())
-                            potential_splits = potential_splits[best_split_idx + 1:]
-                            remaining_text = " ".join(potential_splits)
-                        
-                        # Fallback: Use individual segment translations if hybrid fails
-                        if not success or len(split_parts) != segment_count:
-                            split_parts = None
-
-                        # Assign split parts to segments (or fallback to individual translations)
-                        segment_ids = list(block_data["segments"].keys())
-                        for i, seg_id in enumerate(segment_ids):
-                            if split_parts and i < len(split_parts):
-                                # Use hybrid split result
-                                segment_translations[seg_id] = split_parts[i]
-                            else:
-                                # Fallback to individual segment translation
-                                seg_text = block_data["segments"][seg_id]
-                                if isinstance(seg_text, dict) and "text" in seg_text:
-                                    segment_translations[seg_id] = seg_text["text"]
-                                else:
-                                    segment_translations[seg_id] = seg_text
-
-        with open(segment_file, "w", encoding="utf-8") as f:
-            json.dump(segment_translations, f, indent=2, ensure_ascii=False)
-        print(f"✅ Segment-only translations exported with block decoupling: {segment_file}")
+            for seg_id, seg_text in block_data.get("segments", _EMPTY).items():
+                if isinstance(seg_text, dict) and "text" in seg_text:
+                    segment_translations[seg_id] = seg_text["text"]
+                else:
+                    segment_translations[seg_id] = seg_text
+
+        dump_json(segment_translations, segment_file)
+        print(f"✅ Segment-only translations exported: {segment_file}")
 
 
     # NEW: Track memory usage statistics
@@ -520,18 +728,26 @@ def translate_json_file(
         translatable_map=translatable_map,
         output_dir=os.path.dirname(output_file),
         input_filename=input_file,
-        all_segments_info=all_segments_info
+        all_segments_info=all_segments_info,
+        cache_hits=deepl_metrics["cache_hits"],
+        cache_misses=deepl_metrics["cache_misses"]
     )
 
     # Save DeepL metrics
     metrics_file = os.path.join(os.path.dirname(output_file), "deepl_metrics.json")
-    with open(metrics_file, "w", encoding="utf-8") as f:
-        json.dump(deepl_metrics, f, indent=2, ensure_ascii=False)
+    dump_json(deepl_metrics, metrics_file)
     print(f"📊 DeepL metrics saved: {deepl_metrics}")
+
+    # Outputs are written either way, but a partial translation is a failed run
+    if deepl_metrics["failed_translations"]:
+        raise RuntimeError(
+            f"{deepl_metrics['failed_translations']} texts could not be translated "
+            f"(DeepL errors); their source text was kept and not saved to memory"
+        )
     
     return translated_data
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(
         description="Translate JSON content with enhanced global memory support"
     )
@@ -546,13 +762,19 @@ def main():
     parser.add_argument("--secondary-lang",
                        help="Secondary source language code")
     parser.add_argument("--memory", "-m", 
-                       help="Path to shared translation memory file")
+                       help="Path to shared translation memory file "
+                            "(.jsonl = append-only journal, .sqlite/.db = SQLite table, "
+                            ".msgpack/.mpk = msgpack map, otherwise a JSON object)")
+    parser.add_argument("--memory-format", choices=MEMORY_FORMATS,
+                       help="Storage format of --memory (default: inferred from its suffix)")
     parser.add_argument("--update-memory", action="store_true",
                        help="Update translation memory with new translations")
     parser.add_argument("--segments", "-s", 
                        help="Output file for segment-only translations")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                       help="Print every translation memory hit")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     try:
         translate_json_file(
@@ -563,7 +785,9 @@ def main():
             secondary_lang=args.secondary_lang,
             memory_file=args.memory,
             update_memory=args.update_memory,
-            segment_file=args.segments
+            segment_file=args.segments,
+            verbose=args.verbose,
+            memory_format=args.memory_format
         )
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -4,6 +4,70 @@ Unified template detection for both pasted text and uploaded files.
 """
 import re
 
+# Jinja2/Flask template patterns
+_JINJA_PATTERN_SPECS = [
+    (r'{%\s*extends\s+["\']', 0.5, 'strong'),  # {% extends "base.html" %}
+    (r'{%\s*block\s+\w+', 0.4, 'strong'),      # {% block content %}
+    (r'{%\s*include\s+["\']', 0.4, 'strong'),  # {% include "file.html" %}
+    (r'{%\s*import\s+', 0.4, 'strong'),        # {% import ... %}
+    (r'{%\s*macro\s+\w+', 0.4, 'strong'),      # {% macro name() %}
+    (r'{{\s*super\s*\(\s*\)\s*}}', 0.4, 'strong'),  # {{ super() }}
+    (r'{{\s*url_for\s*\(', 0.4, 'strong'),     # {{ url_for(...) }}
+    (r'{%\s*for\s+\w+\s+in\s+', 0.2, 'medium'), # {% for item in items %}
+    (r'{%\s*if\s+', 0.2, 'medium'),            # {% if condition %}
+    (r'{%\s*set\s+\w+', 0.2, 'medium'),        # {% set var = value %}
+    (r'{{\s*\w+', 0.1, 'weak'),                # {{ variable }}
+    (r'{%\s*\w+', 0.1, 'weak'),                # {% tag %}
+    (r'{%-?\s*', 0.1, 'weak'),                 # Whitespace control
+    (r'\s*-%}', 0.1, 'weak'),                  # Whitespace control
+    (r'{#.*?#}', 0.1, 'weak'),                 # {# comment #}
+]
+
+# Django template patterns
+_DJANGO_PATTERN_SPECS = [
+    (r'{%\s*load\s+\w+', 0.5, 'strong'),       # {% load static %}
+    (r'{%\s*csrf_token\s*%}', 0.5, 'strong'),  # {% csrf_token %}
+    (r'{%\s*static\s+["\']', 0.4, 'strong'),   # {% static "..." %}
+    (r'{%\s*url\s+["\']', 0.4, 'strong'),      # {% url "name" %}
+    (r'{%\s*trans\s+["\']', 0.4, 'strong'),    # {% trans "..." %}
+    (r'{%\s*blocktrans\s*%}', 0.4, 'strong'),  # {% blocktrans %}
+    (r'{{\s*block\.super\s*}}', 0.4, 'strong'), # {{ block.super }}
+    (r'{%\s*with\s+\w+', 0.2, 'medium'),       # {% with var=value %}
+    (r'{%\s*autoescape\s+', 0.2, 'medium'),    # {% autoescape %}
+]
+
+# Compiled once at import; detect_template_content runs for every upload/paste.
+# Each pattern is searched on its own: a single-pattern search keeps re's
+# literal-prefix scan, which a combined alternation would lose.
+_JINJA_PATTERNS = [
+    (re.compile(pattern, re.IGNORECASE | re.MULTILINE), weight, strength)
+    for pattern, weight, strength in _JINJA_PATTERN_SPECS
+]
+_DJANGO_PATTERNS = [
+    (re.compile(pattern, re.IGNORECASE | re.MULTILINE), weight, strength)
+    for pattern, weight, strength in _DJANGO_PATTERN_SPECS
+]
+
+# Search order for detect_template_content: strong patterns first, then
+# medium, then weak, alternating Jinja/Django within each strength, so a
+# clearly mixed template saturates after a few searches.
+# Entries are (pattern, weight in tenths, is_strong, is_jinja, table index).
+_STRENGTH_RANK = {'strong': 0, 'medium': 1, 'weak': 2}
+_SEARCH_ORDER = [
+    (pattern, round(weight * 10), strength == 'strong', is_jinja, index)
+    for _, index, is_jinja, pattern, weight, strength in sorted(
+        (_STRENGTH_RANK[strength], index, is_jinja, pattern, weight, strength)
+        for is_jinja, patterns in ((True, _JINJA_PATTERNS), (False, _DJANGO_PATTERNS))
+        for index, (pattern, weight, strength) in enumerate(patterns)
+    )
+]
+_LEADING_TAG_RE = re.compile(r'{%\s*(extends|load|import|from)')
+_HTML_STRUCT_RE = re.compile(r'<!doctype|<html|<head>|<body>', re.IGNORECASE)
+
+# Bit flags for the template families found in a text
+_JINJA = 1
+_DJANGO = 2
+
 
 def detect_template_content(text: str) -> tuple[bool, float, str]:
     """
@@ -21,83 +85,65 @@ def detect_template_content(text: str) -> tuple[bool, float, str]:
     if not text or len(text.strip()) < 10:
         return False, 0.0, 'none'
     
-    score = 0.0
-    detected_types = []
+    # Every pattern needs a '{' or a '%}'; without either nothing can match
+    if '{' not in text and '%}' not in text:
+        return False, 0.0, 'none'
     
-    # Jinja2/Flask template patterns
-    jinja_patterns = [
-        (r'{%\s*extends\s+["\']', 0.5, 'strong'),  # {% extends "base.html" %}
-        (r'{%\s*block\s+\w+', 0.4, 'strong'),      # {% block content %}
-        (r'{%\s*include\s+["\']', 0.4, 'strong'),  # {% include "file.html" %}
-        (r'{%\s*import\s+', 0.4, 'strong'),        # {% import ... %}
-        (r'{%\s*macro\s+\w+', 0.4, 'strong'),      # {% macro name() %}
-        (r'{{\s*super\s*\(\s*\)\s*}}', 0.4, 'strong'),  # {{ super() }}
-        (r'{{\s*url_for\s*\(', 0.4, 'strong'),     # {{ url_for(...) }}
-        (r'{%\s*for\s+\w+\s+in\s+', 0.2, 'medium'), # {% for item in items %}
-        (r'{%\s*if\s+', 0.2, 'medium'),            # {% if condition %}
-        (r'{%\s*set\s+\w+', 0.2, 'medium'),        # {% set var = value %}
-        (r'{{\s*\w+', 0.1, 'weak'),                # {{ variable }}
-        (r'{%\s*\w+', 0.1, 'weak'),                # {% tag %}
-        (r'{%-?\s*', 0.1, 'weak'),                 # Whitespace control
-        (r'\s*-%}', 0.1, 'weak'),                  # Whitespace control
-        (r'{#.*?#}', 0.1, 'weak'),                 # {# comment #}
-    ]
+    score = 0.0
+    detected = 0
     
-    jinja_score = 0.0
+    # Running scores are kept in integer tenths so the saturation test is exact
+    jinja_tenths = 0
+    django_tenths = 0
     jinja_strong_found = False
-    
-    for pattern, weight, strength in jinja_patterns:
-        if re.search(pattern, text, re.IGNORECASE | re.MULTILINE):
-            jinja_score += weight
-            if strength == 'strong':
-                jinja_strong_found = True
+    django_strong_found = False
+    jinja_matched = [False] * len(_JINJA_PATTERNS)
+    django_matched = [False] * len(_DJANGO_PATTERNS)
+    
+    for pattern, tenths, is_strong, is_jinja, index in _SEARCH_ORDER:
+        if not pattern.search(text):
+            continue
+        if is_jinja:
+            jinja_matched[index] = True
+            jinja_tenths += tenths
+            jinja_strong_found = jinja_strong_found or is_strong
+        else:
+            django_matched[index] = True
+            django_tenths += tenths
+            django_strong_found = django_strong_found or is_strong
+        # Both families present and capped scores already reach 1.0: weights
+        # are positive, so the rest of the searches cannot change the result
+        if jinja_tenths and django_tenths and min(jinja_tenths, 8) + min(django_tenths, 8) >= 10:
+            return True, 1.0, 'mixed'
+    
+    # Sum the float weights in table order so scores match the per-family scans
+    jinja_score = sum(w for (_, w, _), hit in zip(_JINJA_PATTERNS, jinja_matched) if hit)
+    django_score = sum(w for (_, w, _), hit in zip(_DJANGO_PATTERNS, django_matched) if hit)
     
     if jinja_score > 0:
-        detected_types.append('jinja2')
+        detected |= _JINJA
         score += min(jinja_score, 0.8)
     
-    # Django template patterns
-    django_patterns = [
-        (r'{%\s*load\s+\w+', 0.5, 'strong'),       # {% load static %}
-        (r'{%\s*csrf_token\s*%}', 0.5, 'strong'),  # {% csrf_token %}
-        (r'{%\s*static\s+["\']', 0.4, 'strong'),   # {% static "..." %}
-        (r'{%\s*url\s+["\']', 0.4, 'strong'),      # {% url "name" %}
-        (r'{%\s*trans\s+["\']', 0.4, 'strong'),    # {% trans "..." %}
-        (r'{%\s*blocktrans\s*%}', 0.4, 'strong'),  # {% blocktrans %}
-        (r'{{\s*block\.super\s*}}', 0.4, 'strong'), # {{ block.super }}
-        (r'{%\s*with\s+\w+', 0.2, 'medium'),       # {% with var=value %}
-        (r'{%\s*autoescape\s+', 0.2, 'medium'),    # {% autoescape %}
-    ]
-    
-    django_score = 0.0
-    django_strong_found = False
-    
-    for pattern, weight, strength in django_patterns:
-        if re.search(pattern, text, re.IGNORECASE | re.MULTILINE):
-            django_score += weight
-            if strength == 'strong':
-                django_strong_found = True
-    
     if django_score > 0:
-        detected_types.append('django')
+        detected |= _DJANGO
         score += min(django_score, 0.8)
     
     # Check for template indicators at the beginning of content
     first_lines = '\n'.join(text.split('\n')[:5])
-    if re.search(r'{%\s*(extends|load|import|from)', first_lines):
+    if _LEADING_TAG_RE.search(first_lines):
         score += 0.3
     
     # Check if it looks like a template fragment (no HTML structure)
-    has_html_structure = any(tag in text.lower() for tag in ['<!doctype', '<html', '<head>', '<body>'])
+    has_html_structure = _HTML_STRUCT_RE.search(text) is not None
     if not has_html_structure and (jinja_score > 0 or django_score > 0):
         score += 0.2
     
     # Determine template type
-    if 'jinja2' in detected_types and 'django' in detected_types:
+    if detected == _JINJA | _DJANGO:
         template_type = 'mixed'
-    elif 'jinja2' in detected_types:
+    elif detected == _JINJA:
         template_type = 'jinja2'
-    elif 'django' in detected_types:
+    elif detected == _DJANGO:
         template_type = 'django'
     else:
         template_type = 'none'
@@ -0,0 +1,88 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled create_content_hash for step2_translate.
+
+Build in place with ``cythonize -i text_utils.pyx``. step2_translate imports
+this module when it is available and keeps its pure-Python definition
+otherwise; both must produce identical output, since create_content_hash
+feeds the persistent translation memory keys.
+
+The whitespace collapse runs as a C loop over the string's code points
+instead of a regex substitution.
+"""
+import hashlib
+from cpython.unicode cimport PyUnicode_FromKindAndData, PyUnicode_4BYTE_KIND
+from cpython.mem cimport PyMem_Malloc, PyMem_Free
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Must match step2_translate.CONTENT_HASH_SCHEME; the importer checks it
+CONTENT_HASH_SCHEME = "xxh3" if xxhash is not None else "hash"
+
+cdef object _XXH3 = xxhash.xxh3_64_hexdigest if xxhash is not None else None
+cdef object _MD5 = hashlib.md5
+
+
+cdef inline bint _is_ws(Py_UCS4 c) noexcept:
+    # Exactly the code points the regex module's \s matches (Unicode
+    # White_Space); str.isspace() would also match U+001C..U+001F
+    if c <= 0x20:
+        return c == 0x20 or 0x09 <= c <= 0x0d
+    if c < 0x85:
+        return False
+    return (c == 0x85 or c == 0xa0 or c == 0x1680 or 0x2000 <= c <= 0x200a
+            or c == 0x2028 or c == 0x2029 or c == 0x202f or c == 0x205f or c == 0x3000)
+
+
+cdef str _collapse_whitespace(str text):
+    """Equivalent of regex.sub(r'\\s+', ' ', text)."""
+    cdef Py_ssize_t n = len(text)
+    cdef Py_ssize_t i
+    cdef Py_UCS4 c
+    cdef bint needs_rewrite = False
+    cdef bint prev_ws = False
+
+    # Fast path: nothing but single plain spaces -> return the input as is
+    for i in range(n):
+        c = text[i]
+        if _is_ws(c):
+            if c != 0x20 or prev_ws:
+                needs_rewrite = True
+                break
+            prev_ws = True
+        else:
+            prev_ws = False
+    if not needs_rewrite:
+        return text
+
+    cdef Py_UCS4 *out = <Py_UCS4 *> PyMem_Malloc(n * sizeof(Py_UCS4))
+    if out == NULL:
+        raise MemoryError()
+    cdef Py_ssize_t j = 0
+    prev_ws = False
+    try:
+        for i in range(n):
+            c = text[i]
+            if _is_ws(c):
+                if not prev_ws:
+                    out[j] = 0x20
+                    j += 1
+                prev_ws = True
+            else:
+                out[j] = c
+                j += 1
+                prev_ws = False
+        return PyUnicode_FromKindAndData(PyUnicode_4BYTE_KIND, out, j)
+    finally:
+        PyMem_Free(out)
+
+
+cpdef str create_content_hash(str text):
+    """Create a consistent hash for content-based memory keys"""
+    cdef bytes normalized = _collapse_whitespace(text.strip().lower()).encode('utf-8')
+    if _XXH3 is not None:
+        return _XXH3(normalized)
+    return _MD5(normalized).hexdigest()[:12]